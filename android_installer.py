@@ -24,6 +24,8 @@ class AndroidInstaller:
     
     def __init__(self):
         self.android_home = os.path.join(os.environ.get("LOCALAPPDATA", ""), "Android", "Sdk")
+        # Environment for SDK tool subprocesses, shared by every spawn
+        self.sdk_env = {**os.environ, "ANDROID_HOME": self.android_home, "ANDROID_SDK_ROOT": self.android_home}
         self.progress_callback: Optional[Callable[[str, int], None]] = None
         self.status_callback: Optional[Callable[[str], None]] = None
         
@@ -169,18 +171,13 @@ class AndroidInstaller:
                 self._update_status("SDK Manager not found")
                 return False
                 
-            # Set environment variables
-            env = os.environ.copy()
-            env["ANDROID_HOME"] = self.android_home
-            env["ANDROID_SDK_ROOT"] = self.android_home
-            
             cmd = [sdk_manager] + args
             self._update_status(f"Running: {' '.join(args)}")
             
             # Run with automatic license acceptance
             process = subprocess.Popen(
                 cmd,
-                env=env,
+                env=self.sdk_env,
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
@@ -243,11 +240,6 @@ class AndroidInstaller:
             if not os.path.exists(avd_manager):
                 return False
                 
-            # Set environment variables
-            env = os.environ.copy()
-            env["ANDROID_HOME"] = self.android_home
-            env["ANDROID_SDK_ROOT"] = self.android_home
-            
             # Create AVD command with device specification
             system_image = f"system-images;android-{self.android_14_api_level};google_apis;x86_64"
             cmd = [
@@ -260,7 +252,7 @@ class AndroidInstaller:
             
             process = subprocess.Popen(
                 cmd,
-                env=env,
+                env=self.sdk_env,
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
@@ -354,11 +346,6 @@ class AndroidInstaller:
             if not os.path.exists(avd_manager):
                 return False
                 
-            # Set environment variables
-            env = os.environ.copy()
-            env["ANDROID_HOME"] = self.android_home
-            env["ANDROID_SDK_ROOT"] = self.android_home
-            
             # Create AVD command
             system_image = f"system-images;android-{self.android_14_api_level};google_apis;x86_64"
             cmd = [
@@ -370,7 +357,7 @@ class AndroidInstaller:
             
             process = subprocess.Popen(
                 cmd,
-                env=env,
+                env=self.sdk_env,
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
@@ -115,10 +115,11 @@ class AudioDeviceManager:
         }
         
     def create_audio_streams(self, account_id: int, sample_rate: int = 8000, 
-                           chunk_size: int = 160) -> Tuple[Optional[object], Optional[object], Optional[int], Optional[int]]:
+                           chunk_size: int = 160, output_callback=None) -> Tuple[Optional[object], Optional[object], Optional[int], Optional[int]]:
         """Create input and output audio streams for a specific account with fallback.
         Returns (input_stream, output_stream, actual_rate, device_chunk) where actual_rate/device_chunk may
         differ from requested if the device rejected 8 kHz. device_chunk is 20 ms worth of frames at actual_rate.
+        If output_callback is given, the output stream runs in PyAudio callback mode and pulls audio from it.
         """
         # Use effective per-account devices (runtime override or config fallback)
         eff = self.get_account_audio_devices(account_id)
@@ -187,7 +188,8 @@ class AudioDeviceManager:
                         rate=rate,
                         output=True,
                         output_device_index=out_idx,
-                        frames_per_buffer=frames_per_chunk
+                        frames_per_buffer=frames_per_chunk,
+                        stream_callback=output_callback
                     )
                 else:
                     output_stream = self.audio.open(
@@ -195,7 +197,8 @@ class AudioDeviceManager:
                         channels=1,
                         rate=rate,
                         output=True,
-                        frames_per_buffer=frames_per_chunk
+                        frames_per_buffer=frames_per_chunk,
+                        stream_callback=output_callback
                     )
             except Exception as e:
                 last_err = e
@@ -3,17 +3,20 @@ Automated WhatsApp Voice Caller
 Uses the discovered call button position for reliable voice calls
 """
 
+import json
 import time
 import pyautogui
 import webbrowser
 import subprocess
 import psutil
 
-# Import the discovered call button position
+# Load the discovered call button position (written by direct_whatsapp_caller)
 try:
-    from whatsapp_call_position import CALL_BUTTON_X, CALL_BUTTON_Y
+    with open("whatsapp_call_position.json", "r", encoding="utf-8") as f:
+        _position = json.load(f)
+    CALL_BUTTON_X, CALL_BUTTON_Y = _position["x"], _position["y"]
     CALL_POSITION_FOUND = True
-except ImportError:
+except (OSError, ValueError, KeyError):
     CALL_BUTTON_X, CALL_BUTTON_Y = 1800, 80  # Default fallback
     CALL_POSITION_FOUND = False
 
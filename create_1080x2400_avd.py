@@ -14,6 +14,22 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from android_installer import AndroidInstaller
 
+EMULATOR_EXE = r"C:\Users\Roshan\AppData\Local\Android\Sdk\emulator\emulator.exe"
+ANDROID_SDK_PATH = os.path.dirname(os.path.dirname(EMULATOR_EXE))
+ADB_EXE = os.path.join(ANDROID_SDK_PATH, "platform-tools", "adb.exe")
+AVD_HOME = os.path.join(os.path.expanduser("~"), ".android", "avd")
+
+# Snapshot saved after the first cold boot and restored on later launches
+BOOT_SNAPSHOT = "boot_ready"
+
+# Environment shared by every emulator launch; built once, never mutated
+ANDROID_ENV = {
+    **os.environ,
+    'ANDROID_SDK_ROOT': ANDROID_SDK_PATH,
+    'ANDROID_HOME': ANDROID_SDK_PATH,
+    'ANDROID_AVD_HOME': AVD_HOME,
+}
+
 def create_1080x2400_avd():
     """Create a new Android 14 AVD with 1080x2400 display resolution"""
     print("📱 Creating Android 14 AVD with 1080x2400 Display")
@@ -103,12 +119,59 @@ def create_1080x2400_avd():
         print(f"💡 Try running as administrator or check Android SDK installation")
         return False
 
-def test_emulator_launch():
-    """Test launching the new AVD"""
+def boot_snapshot_exists(avd_name):
+    """Check whether the boot snapshot has already been saved for an AVD"""
+    return os.path.isdir(os.path.join(AVD_HOME, f"{avd_name}.avd", "snapshots", BOOT_SNAPSHOT))
+
+def save_boot_snapshot(port, timeout=300):
+    """Wait for the emulator to finish booting, then save the boot snapshot"""
+    serial = f"emulator-{port}"
+    start = time.time()
+    deadline = start + timeout
+    
+    while time.time() < deadline:
+        try:
+            result = subprocess.run([ADB_EXE, "-s", serial, "shell", "getprop", "sys.boot_completed"],
+                                  capture_output=True, text=True, timeout=10, env=ANDROID_ENV)
+            if result.stdout.strip() == "1":
+                print(f"   ✅ Android booted after {int(time.time() - start)}s")
+                break
+        except Exception:
+            pass
+        print(f"   ⏳ Waiting for boot... {int(time.time() - start)}s / {timeout}s", flush=True)
+        time.sleep(5)
+    else:
+        print(f"   ⚠️  Emulator did not finish booting within {timeout}s, snapshot not saved")
+        return False
+    
+    print(f"   💾 Saving boot snapshot '{BOOT_SNAPSHOT}'...")
+    result = subprocess.run([ADB_EXE, "-s", serial, "emu", "avd", "snapshot", "save", BOOT_SNAPSHOT],
+                          capture_output=True, text=True, timeout=120, env=ANDROID_ENV)
+    if result.returncode == 0:
+        print(f"   💾 Boot snapshot '{BOOT_SNAPSHOT}' saved - next launch will restore it")
+        return True
+    
+    print(f"   ⚠️  Failed to save boot snapshot: {result.stderr.strip()}")
+    return False
+
+def test_emulator_launch(log_path=None, headless=None, rebuild_snapshot=False, save_snapshot=False):
+    """Test launching the new AVD
+    
+    Emulator output is discarded unless log_path is given, in which case it
+    is appended (unbuffered) to that file. headless=None auto-selects the
+    headless flag set when running under CI. Launches restore the saved boot
+    snapshot when one exists unless rebuild_snapshot is set. With
+    save_snapshot (implied by rebuild_snapshot), a cold launch waits for the
+    boot to finish and saves the snapshot before returning; otherwise it
+    returns as soon as the emulator process starts.
+    """
+    if headless is None:
+        headless = os.environ.get("CI", "").lower() in ("1", "true", "yes")
+    
     print(f"\n4️⃣ TESTING EMULATOR LAUNCH:")
     print("-" * 30)
     
-    emulator_exe = r"C:\Users\Roshan\AppData\Local\Android\Sdk\emulator\emulator.exe"
+    emulator_exe = EMULATOR_EXE
     if not os.path.exists(emulator_exe):
         print(f"❌ Emulator executable not found: {emulator_exe}")
         return False
@@ -119,32 +182,58 @@ def test_emulator_launch():
     print(f"   Launching: {avd_name}")
     print(f"   Port: {port}")
     print(f"   Resolution: 1080x2400")
+    print(f"   Mode: {'headless' if headless else 'GUI'}")
     
-    # Set environment
-    env = os.environ.copy()
-    android_sdk_path = os.path.dirname(os.path.dirname(emulator_exe))
-    env['ANDROID_SDK_ROOT'] = android_sdk_path
-    env['ANDROID_HOME'] = android_sdk_path
-    env['ANDROID_AVD_HOME'] = os.path.join(os.path.expanduser("~"), ".android", "avd")
+    use_snapshot = not rebuild_snapshot and boot_snapshot_exists(avd_name)
+    print(f"   Boot: {'snapshot ' + BOOT_SNAPSHOT if use_snapshot else 'cold boot'}")
     
     # Launch command
     args = [
         emulator_exe, "-avd", avd_name, 
         "-port", str(port),
-        "-no-snapshot", "-netdelay", "none", "-netspeed", "full", "-no-boot-anim"
+        "-netdelay", "none", "-netspeed", "full", "-no-boot-anim"
     ]
+    if headless:
+        # Skip host GPU probing and audio init
+        args += ["-no-window", "-no-audio", "-gpu", "swiftshader_indirect", "-accel", "on"]
+    if use_snapshot:
+        # Restore the saved boot state and never write state back
+        args += ["-snapshot", BOOT_SNAPSHOT, "-no-snapshot-save"]
+        if headless:
+            args += ["-read-only"]
+    else:
+        args += ["-no-snapshot-load"]
     
     try:
         print(f"   Starting emulator...")
-        process = subprocess.Popen(
-            args,
-            creationflags=subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0,
-            env=env
-        )
+        if log_path:
+            log = open(log_path, 'ab', buffering=0)
+            print(f"   Emulator log: {log_path}")
+        else:
+            log = subprocess.DEVNULL
+        try:
+            process = subprocess.Popen(
+                args,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                creationflags=subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0,
+                env=ANDROID_ENV
+            )
+        finally:
+            if log_path:
+                log.close()
         
         print(f"   ✅ Emulator launched! PID: {process.pid}")
         print(f"   📱 AVD should appear with 1080x2400 display")
-        print(f"   ⏰ Wait for Android to fully boot before testing")
+        
+        if use_snapshot:
+            print(f"   ⚡ Restoring boot snapshot, Android should be ready in seconds")
+        elif save_snapshot or rebuild_snapshot:
+            print(f"   ⏰ Waiting for Android to fully boot to save a boot snapshot...")
+            save_boot_snapshot(port)
+        else:
+            print(f"   💡 Cold boot; run with --save-snapshot to save a boot snapshot for faster launches")
         
         return True
         
@@ -153,6 +242,14 @@ def test_emulator_launch():
         return False
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Create the 1080x2400 Android 14 AVD")
+    parser.add_argument("--rebuild-snapshot", action="store_true",
+                        help="cold boot on test launch and re-save the boot snapshot")
+    parser.add_argument("--save-snapshot", action="store_true",
+                        help="after a cold test launch, wait for boot and save a boot snapshot")
+    cli_args = parser.parse_args()
+    
     try:
         if create_1080x2400_avd():
             print(f"\n🎉 AVD CREATION COMPLETED SUCCESSFULLY!")
@@ -162,7 +259,8 @@ if __name__ == "__main__":
             response = input().strip().lower()
             
             if response == 'y' or response == 'yes':
-                test_emulator_launch()
+                test_emulator_launch(rebuild_snapshot=cli_args.rebuild_snapshot,
+                                     save_snapshot=cli_args.save_snapshot)
             else:
                 print(f"\n💡 You can test the emulator later using the SIP Dialer GUI")
         else:
@@ -3,6 +3,7 @@
 import os
 import subprocess
 import time
+from functools import lru_cache
 from pathlib import Path
 
 def find_android_sdk():
@@ -18,6 +19,20 @@ def find_android_sdk():
             return path
     return None
 
+@lru_cache(maxsize=1)
+def list_avds():
+    """List existing AVD names (cached; call list_avds.cache_clear() after creating one)"""
+    sdk_path = find_android_sdk()
+    if not sdk_path:
+        return None
+    
+    emulator_exe = os.path.join(sdk_path, "emulator", "emulator.exe")
+    result = subprocess.run([emulator_exe, "-list-avds"], 
+                          capture_output=True, text=True, timeout=10)
+    if result.returncode != 0:
+        return None
+    return tuple(result.stdout.strip().split('\n'))
+
 def create_avd(avd_name: str, account_id: int):
     """Create a new AVD for a specific account"""
     sdk_path = find_android_sdk()
@@ -57,6 +72,7 @@ def create_avd(avd_name: str, account_id: int):
         
         if result.returncode == 0:
             print(f"✅ Account {account_id}: AVD {avd_name} created successfully")
+            list_avds.cache_clear()
             
             # Configure the AVD for optimal performance
             configure_avd(avd_name, account_id)
@@ -149,12 +165,22 @@ def main():
         # Fallback to 2 accounts if config manager fails
         account_ids = [1, 2]
     
+    try:
+        existing_avds = list_avds() or ()
+    except Exception:
+        existing_avds = ()
+    
     # Create individual AVDs for configured accounts
     avd_names = []
     for account_id in account_ids:
         avd_name = f"SipDialer_Account_{account_id}"
         avd_names.append(avd_name)
         
+        if avd_name in existing_avds:
+            print(f"✅ Account {account_id}: AVD {avd_name} already exists, skipping creation")
+            configure_avd(avd_name, account_id)
+            continue
+        
         success = create_avd(avd_name, account_id)
         if not success:
             print(f"⚠️  Failed to create AVD for Account {account_id}, continuing with others...")
@@ -165,15 +191,11 @@ def main():
     print("\n📋 Summary of Created AVDs:")
     print("-" * 30)
     
-    # List all AVDs to verify
-    sdk_path = find_android_sdk()
-    if sdk_path:
-        emulator_exe = os.path.join(sdk_path, "emulator", "emulator.exe")
+    # List all AVDs to verify (reuses the cached listing if nothing was created)
+    if find_android_sdk():
         try:
-            result = subprocess.run([emulator_exe, "-list-avds"], 
-                                  capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                existing_avds = result.stdout.strip().split('\n')
+            existing_avds = list_avds()
+            if existing_avds is not None:
                 for i, avd_name in enumerate(avd_names, 1):
                     if avd_name in existing_avds:
                         print(f"✅ Account {i}: {avd_name}")
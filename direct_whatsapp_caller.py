@@ -3,31 +3,179 @@ Direct WhatsApp Call Button Clicker
 Finds and clicks the voice call button directly
 """
 
+import json
+import os
 import subprocess
+import sys
 import time
 import pyautogui
 import webbrowser
+import numpy as np
 from PIL import Image
 import psutil
 
+# Characters stripped from phone numbers before building whatsapp:// URLs
+_PHONE_STRIP = str.maketrans('', '', '+-() \u00a0')
+
+POSITION_FILE = "whatsapp_call_position.json"
+
 class DirectWhatsAppCaller:
-    def __init__(self):
+    def __init__(self, call_active_template="call_active_template.png", match_threshold=0.75,
+                 end_call_position=None):
         self.debug = True
+        self.session_open = False
+        self.end_call_position = end_call_position
+        self._saved_position = self._load_saved_position()
+        # Start from the position saved by an earlier run, if any
+        self.call_position = self._saved_position
+        self.match_threshold = match_threshold
+        self.call_active_template_path = call_active_template
+        self.call_active_template = self._load_template(call_active_template)
+        if self.call_active_template is None:
+            self.log(f"Call-in-progress template not available ({call_active_template}); "
+                     f"starts will be confirmed interactively and the template captured")
         
     def log(self, message):
         if self.debug:
             print(f"[Direct Caller] {message}")
     
+    def _load_template(self, path):
+        """Load the call-in-progress template as grayscale; None if missing or OpenCV is not installed"""
+        try:
+            import cv2
+        except ImportError:
+            self.log("OpenCV (opencv-python) not installed, template matching disabled")
+            return None
+        if not os.path.exists(path):
+            return None
+        return cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    
+    def capture_call_active_template(self, center, size=(240, 120)):
+        """Save the screen around a confirmed call button click as the call-in-progress template"""
+        try:
+            x, y = center
+            w, h = size
+            screen_width, screen_height = pyautogui.size()
+            left = min(max(0, x - w // 2), max(0, screen_width - w))
+            top = min(max(0, y - h // 2), max(0, screen_height - h))
+            pyautogui.screenshot(region=(left, top, w, h)).save(self.call_active_template_path)
+            self.call_active_template = self._load_template(self.call_active_template_path)
+            self.log(f"Saved call-in-progress template: {self.call_active_template_path}")
+        except Exception as e:
+            self.log(f"Error capturing call template: {e}")
+    
+    def _confirm_call_started(self, x, y, phone_number):
+        """Ask whether a click started a call; returns True, False, or None to stop probing"""
+        print(f"\n=== POSITION TEST ===")
+        print(f"Clicked at: ({x}, {y})")
+        print(f"Target: {phone_number}")
+        result = input("Voice call started? (y/n/q): ").strip().lower()
+        if result == 'q':
+            return None
+        if result == 'y':
+            # Later checks can then run unattended
+            if self.call_active_template is None:
+                self.capture_call_active_template((x, y))
+            return True
+        return False
+    
+    def call_started(self, x, y, phone_number):
+        """Check whether a click at (x, y) started a call: template match, else ask"""
+        if self.call_active_template is None:
+            return self._confirm_call_started(x, y, phone_number)
+        return self.is_call_active()
+    
+    def is_call_active(self):
+        """Check the screen for the call-in-progress indicator via template matching"""
+        if self.call_active_template is None:
+            return False
+        try:
+            import cv2
+            screenshot = cv2.cvtColor(np.array(pyautogui.screenshot()), cv2.COLOR_RGB2GRAY)
+            result = cv2.matchTemplate(screenshot, self.call_active_template, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, _ = cv2.minMaxLoc(result)
+            self.log(f"Call indicator match confidence: {max_val:.2f}")
+            return max_val > self.match_threshold
+        except Exception as e:
+            self.log(f"Error matching call indicator: {e}")
+            return False
+    
+    def _launch_url(self, url):
+        """Hand a whatsapp:// URL to the OS protocol handler"""
+        if sys.platform == 'win32':
+            import ctypes
+            ctypes.windll.shell32.ShellExecuteW(None, "open", url, None, None, 1)
+        else:
+            webbrowser.open(url)
+    
+    def open_session(self):
+        """Start WhatsApp once; later chats reuse the running window"""
+        if self.session_open:
+            return
+        self.log("Starting WhatsApp session")
+        self._launch_url("whatsapp://")
+        time.sleep(6)
+        self.session_open = True
+    
+    def open_chat(self, clean_number):
+        """Switch the running WhatsApp window to the chat for a number"""
+        self.open_session()
+        self.log(f"Opening WhatsApp chat for {clean_number}")
+        self._launch_url(f"whatsapp://send?phone={clean_number}")
+        time.sleep(1)
+    
+    def dial(self, phone_number):
+        """Call a number in the current session using the cached call button position"""
+        if self.call_position is None:
+            return self._discover_and_dial(phone_number)
+        
+        try:
+            clean_number = phone_number.translate(_PHONE_STRIP)
+            self.open_chat(clean_number)
+            
+            pyautogui.click(*self.call_position)
+            time.sleep(2)
+            
+            started = self.call_started(*self.call_position, phone_number)
+            if started is None:
+                return False
+            if started:
+                self.log(f"Call started for {clean_number}")
+                self.save_working_position(self.call_position, phone_number)
+                return True
+            
+            self.log(f"Cached position {self.call_position} did not start a call, rediscovering")
+        except Exception as e:
+            self.log(f"Error dialing {phone_number}: {e}")
+            return False
+        
+        # The layout changed since the position was found; probe once more
+        self.call_position = None
+        return self._discover_and_dial(phone_number)
+    
+    def _discover_and_dial(self, phone_number):
+        """Find the call button by probing, and remember it when a call starts"""
+        success, position = self.find_whatsapp_call_button(phone_number)
+        if success:
+            self.save_working_position(position, phone_number)
+        return success
+    
+    def hang_up(self):
+        """End the current call without closing WhatsApp"""
+        if self.end_call_position is None:
+            self.log("End-call position unknown, leaving call up")
+            return False
+        pyautogui.click(*self.end_call_position)
+        time.sleep(1)
+        return True
+    
     def find_whatsapp_call_button(self, phone_number):
         """Find and click WhatsApp call button"""
         try:
-            clean_number = phone_number.replace('+', '').replace('-', '').replace(' ', '')
+            clean_number = phone_number.translate(_PHONE_STRIP)
             
             # Step 1: Open WhatsApp chat
-            whatsapp_url = f"whatsapp://send?phone={clean_number}"
-            self.log(f"Opening WhatsApp chat for {clean_number}")
-            webbrowser.open(whatsapp_url)
-            time.sleep(6)
+            self.open_chat(clean_number)
             
             # Step 2: Take screenshot for debugging
             try:
@@ -76,66 +224,79 @@ class DirectWhatsAppCaller:
                     pyautogui.click(x, y)
                     time.sleep(2)
                     
-                    # Interactive check
-                    print(f"\n=== POSITION TEST {i} ===")
-                    print(f"Clicked at: ({x}, {y})")
-                    print(f"Target: {phone_number}")
-                    result = input("Voice call started? (y/n/q): ").strip().lower()
-                    
-                    if result == 'y':
+                    started = self.call_started(x, y, phone_number)
+                    if started is None:
+                        return False, None
+                    if started:
                         self.log(f"SUCCESS! Call button at ({x}, {y})")
+                        self.call_position = (x, y)
                         return True, (x, y)
-                    elif result == 'q':
-                        return False, None
-                    else:
-                        self.log(f"Position ({x}, {y}) failed, trying next...")
+                    
+                    self.log(f"Position ({x}, {y}) failed, trying next...")
                         
                 except Exception as e:
                     self.log(f"Error with position {i}: {e}")
                     continue
             
-            # Step 6: Manual position input
-            print(f"\n=== MANUAL POSITION INPUT ===")
-            print("All automatic positions failed.")
-            print("Please look at the WhatsApp window and find the voice call button.")
-            print("It's usually a phone icon in the top-right area.")
-            
+            # Step 6: No position produced a call - keep a screenshot for offline inspection
             try:
-                manual_x = input(f"Enter X coordinate (0-{screen_width}): ").strip()
-                manual_y = input(f"Enter Y coordinate (0-{screen_height}): ").strip()
-                
-                if manual_x.isdigit() and manual_y.isdigit():
-                    x, y = int(manual_x), int(manual_y)
-                    self.log(f"Trying manual position: ({x}, {y})")
-                    
-                    pyautogui.click(x, y)
-                    time.sleep(2)
-                    
-                    if input("Did manual click work? (y/n): ").strip().lower() == 'y':
-                        self.log(f"SUCCESS! Manual position ({x}, {y}) works!")
-                        return True, (x, y)
+                pyautogui.screenshot().save("whatsapp_call_not_found.png")
+                self.log("All positions failed. Screenshot saved: whatsapp_call_not_found.png")
             except:
                 pass
             
+            # Step 7: Without a template we are running interactively, so offer manual input
+            if self.call_active_template is None:
+                print(f"\n=== MANUAL POSITION INPUT ===")
+                print("All automatic positions failed.")
+                print("Please look at the WhatsApp window and find the voice call button.")
+                print("It's usually a phone icon in the top-right area.")
+                
+                try:
+                    manual_x = input(f"Enter X coordinate (0-{screen_width}): ").strip()
+                    manual_y = input(f"Enter Y coordinate (0-{screen_height}): ").strip()
+                    
+                    if manual_x.isdigit() and manual_y.isdigit():
+                        x, y = int(manual_x), int(manual_y)
+                        self.log(f"Trying manual position: ({x}, {y})")
+                        
+                        pyautogui.click(x, y)
+                        time.sleep(2)
+                        
+                        if self._confirm_call_started(x, y, phone_number):
+                            self.log(f"SUCCESS! Manual position ({x}, {y}) works!")
+                            self.call_position = (x, y)
+                            return True, (x, y)
+                except:
+                    pass
+            
             return False, None
             
         except Exception as e:
             self.log(f"Error finding call button: {e}")
             return False, None
     
+    def _load_saved_position(self):
+        """Read the last saved call button position, if any"""
+        try:
+            with open(POSITION_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return (data["x"], data["y"])
+        except (OSError, ValueError, KeyError):
+            return None
+    
     def save_working_position(self, position, phone_number):
-        """Save the working position for future use"""
+        """Save the working position for future use (only written when it changes)"""
+        position = tuple(position)
+        if position == self._saved_position:
+            return
         try:
-            config_data = f"""
-# WhatsApp Call Button Position
-# Found for phone: {phone_number}
-# Screen position: {position}
-CALL_BUTTON_X = {position[0]}
-CALL_BUTTON_Y = {position[1]}
-"""
-            with open("whatsapp_call_position.py", "w") as f:
-                f.write(config_data)
-            self.log(f"Saved working position to whatsapp_call_position.py")
+            tmp_file = POSITION_FILE + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({"x": position[0], "y": position[1], "phone": phone_number}, f)
+            os.replace(tmp_file, POSITION_FILE)
+            self._saved_position = position
+            self.log(f"Saved working position to {POSITION_FILE}")
         except Exception as e:
             self.log(f"Error saving position: {e}")
 
@@ -7,27 +7,39 @@ Integrates voice detection with existing SIP components for automatic call answe
 import sys
 import os
 import time
+import queue
 import logging
+from collections import deque
+from functools import partial
 from typing import Optional
 
-# Import existing SIP components
-try:
-    from working_sip_manager import WorkingSipManager
-    from incoming_call_handler import IncomingCallHandler  
-    from voice_detection_auto_answer import VoiceDetectionAutoAnswer, AlwaysRingingManager
-except ImportError as e:
-    print(f"❌ Import error: {e}")
-    print("Please ensure all required modules are available")
-    sys.exit(1)
+# Status labels indexed by bool (False -> 0, True -> 1)
+_YES_NO = ('❌ NO', '✅ YES')
+_REG = ('❌ UNREGISTERED', '✅ REGISTERED')
+_ACT = ('❌ INACTIVE', '✅ ACTIVE')
+_LIS = ('❌ STOPPED', '✅ LISTENING')
 
 class EnhancedSipDialer:
     """
     Enhanced SIP Dialer with voice detection and auto-answer capabilities
     """
     
+    __slots__ = (
+        'logger', 'sip_manager', 'incoming_call_handler', 'voice_detector',
+        'always_ringing', 'is_running', 'accounts_configured', '_event_q',
+        '_status_cache', '_status_cache_ts', '_registered_snapshot',
+        '_listening', '_recent_events', '_fast_register'
+    )
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         
+        # SIP/voice components are imported here rather than at module level so
+        # importing this module (status helpers, --help) stays cheap
+        from working_sip_manager import WorkingSipManager
+        from incoming_call_handler import IncomingCallHandler
+        from voice_detection_auto_answer import VoiceDetectionAutoAnswer, AlwaysRingingManager
+        
         # Initialize SIP components
         self.sip_manager = WorkingSipManager()
         self.incoming_call_handler = IncomingCallHandler(self.sip_manager)
@@ -43,33 +55,72 @@ class EnhancedSipDialer:
         self.is_running = False
         self.accounts_configured = False
         
+        # Registration/voice events pushed by callbacks, consumed by run_event_loop
+        self._event_q = queue.Queue()
+        
+        # Bounded history of recent events (oldest dropped first)
+        self._recent_events = deque(maxlen=256)
+        
+        # Short-lived snapshot of get_system_status(); None means stale
+        self._status_cache = None
+        self._status_cache_ts = 0.0
+        
+        # Registered account IDs, refreshed only when registration state changes
+        self._registered_snapshot: tuple = ()
+        
+        # Accounts with an incoming-call listener already running
+        self._listening: set = set()
+        
+        # Pre-bound add_account call for single-account deployments
+        self._fast_register = None
+        
         # Setup callbacks
         self._setup_callbacks()
         
     def _setup_callbacks(self):
         """Setup callbacks for voice detection events"""
+        # Bound methods rather than bare logger.info partials: besides logging, the
+        # handlers invalidate the status cache and feed run_event_loop's queue
         self.voice_detector.on_voice_detected = self._on_voice_detected
         self.voice_detector.on_voice_stopped = self._on_voice_stopped
         
         # Setup SIP callbacks
         self.sip_manager.on_registration_state_changed = self._on_registration_changed
         
+    def _post_event(self, event: tuple):
+        """Record an event and hand it to run_event_loop"""
+        self._recent_events.append((time.time(),) + event)
+        self._event_q.put(event)
+        
     def _on_voice_detected(self):
         """Callback when human voice is detected"""
         self.logger.info("🗣️ Voice detected - ready to auto-answer calls!")
+        self._status_cache = None
+        self._post_event(('voice', True))
         
     def _on_voice_stopped(self):
         """Callback when voice stops"""
         self.logger.info("🤐 Voice stopped")
+        self._status_cache = None
+        self._post_event(('voice', False))
         
     def _on_registration_changed(self, account_id: int, is_registered: bool):
         """Callback when SIP registration state changes"""
-        status = "✅ REGISTERED" if is_registered else "❌ UNREGISTERED"
-        self.logger.info(f"Account {account_id}: {status}")
+        status = _REG[bool(is_registered)]
+        self.logger.info("Account %s: %s", account_id, status)
         
         if is_registered:
-            # Start listening for incoming calls on this account
-            self.incoming_call_handler.start_listening(account_id)
+            # Start listening for incoming calls on this account (once; re-registrations
+            # must not restart the listener)
+            if account_id not in self._listening:
+                self.incoming_call_handler.start_listening(account_id)
+                self._listening.add(account_id)
+        else:
+            self._listening.discard(account_id)
+        
+        self._registered_snapshot = tuple(self.sip_manager.registered_accounts)
+        self._status_cache = None
+        self._post_event(('reg', account_id, is_registered))
             
     def add_sip_account(self, account_id: int, username: str, password: str, 
                        server: str, port: int = 5060) -> bool:
@@ -85,15 +136,43 @@ class EnhancedSipDialer:
             )
             
             if success:
-                self.logger.info(f"✅ Added SIP account {account_id} ({username}@{server})")
+                self.logger.info("✅ Added SIP account %s (%s@%s)", account_id, username, server)
                 self.accounts_configured = True
                 return True
             else:
-                self.logger.error(f"❌ Failed to add SIP account {account_id}")
+                self.logger.error("❌ Failed to add SIP account %s", account_id)
                 return False
                 
         except Exception as e:
-            self.logger.error(f"❌ Error adding account {account_id}: {e}")
+            self.logger.error("❌ Error adding account %s: %s", account_id, e)
+            return False
+            
+    def specialize_single(self, account_id: int, username: str, password: str,
+                          server: str, port: int = 5060):
+        """Pre-bind the registration of the only account this dialer will use"""
+        self._fast_register = partial(
+            self.sip_manager.add_account,
+            account_id=account_id,
+            username=username,
+            password=password,
+            server=server,
+            port=port
+        )
+        
+    def register_specialized(self) -> bool:
+        """Register the account bound by specialize_single()"""
+        if self._fast_register is None:
+            self.logger.error("❌ No account specialized. Call specialize_single() first.")
+            return False
+            
+        try:
+            if self._fast_register():
+                self.accounts_configured = True
+                return True
+            self.logger.error("❌ Failed to add specialized SIP account")
+            return False
+        except Exception as e:
+            self.logger.error("❌ Error adding specialized account: %s", e)
             return False
             
     def start_enhanced_dialer(self):
@@ -120,14 +199,22 @@ class EnhancedSipDialer:
             self.voice_detector.start_voice_detection()
             
             self.is_running = True
+            self._status_cache = None
             self.logger.info("✅ Enhanced SIP Dialer started successfully!")
             self.logger.info("📞 System is ready to auto-answer calls when voice is detected")
             
             return True
             
         except Exception as e:
-            self.logger.error(f"❌ Failed to start enhanced dialer: {e}")
+            self.logger.error("❌ Failed to start enhanced dialer: %s", e)
             self.stop_enhanced_dialer()
+            # stop_enhanced_dialer is a no-op before is_running is set, so stop
+            # whichever subsystem already started
+            for stop in (self.voice_detector.stop_voice_detection, self.always_ringing.stop_always_ringing):
+                try:
+                    stop()
+                except Exception:
+                    pass
             return False
             
     def stop_enhanced_dialer(self):
@@ -148,10 +235,11 @@ class EnhancedSipDialer:
             self.sip_manager.shutdown()
             
             self.is_running = False
+            self._status_cache = None
             self.logger.info("✅ Enhanced SIP Dialer stopped")
             
         except Exception as e:
-            self.logger.error(f"❌ Error stopping dialer: {e}")
+            self.logger.error("❌ Error stopping dialer: %s", e)
             
     def configure_voice_sensitivity(self, threshold_db: float = -30, 
                                   min_duration: float = 0.5):
@@ -163,37 +251,85 @@ class EnhancedSipDialer:
             min_duration: Minimum voice duration before triggering auto-answer
         """
         self.voice_detector.set_voice_detection_sensitivity(threshold_db, min_duration)
-        self.logger.info(f"Voice sensitivity configured: {threshold_db}dB, {min_duration}s")
+        self._status_cache = None
+        self.logger.info("Voice sensitivity configured: %sdB, %ss", threshold_db, min_duration)
+        
+    def get_system_status(self, max_age: float = 0.5) -> dict:
+        """
+        Get comprehensive system status
+        
+        Args:
+            max_age: Seconds a previously built status may be reused for
+        """
+        now = time.monotonic()
+        if self._status_cache is not None and now - self._status_cache_ts < max_age:
+            return self._status_cache
         
-    def get_system_status(self) -> dict:
-        """Get comprehensive system status"""
         voice_status = self.voice_detector.get_status()
         
-        return {
+        self._status_cache = {
             'is_running': self.is_running,
             'accounts_configured': self.accounts_configured,
-            'registered_accounts': list(self.sip_manager.registered_accounts),
+            'registered_accounts': self._registered_snapshot,
             'voice_detection': voice_status,
             'always_ringing_active': self.always_ringing.is_running,
             'pending_calls': len(self.voice_detector.pending_calls)
         }
+        self._status_cache_ts = now
+        return self._status_cache
         
-    def print_status(self):
+    def get_recent_events(self) -> list:
+        """Get recent voice/registration events as (timestamp, kind, ...) tuples, oldest first"""
+        return list(self._recent_events)
+        
+    def print_status(self, status: Optional[dict] = None):
         """Print current system status"""
-        status = self.get_system_status()
-        
-        print("\n" + "="*60)
-        print("📞 ENHANCED SIP DIALER STATUS")
-        print("="*60)
-        print(f"🚀 System Running: {'✅ YES' if status['is_running'] else '❌ NO'}")
-        print(f"📋 Accounts Configured: {'✅ YES' if status['accounts_configured'] else '❌ NO'}")
-        print(f"📡 Registered Accounts: {status['registered_accounts']}")
-        print(f"📳 Always Ringing: {'✅ ACTIVE' if status['always_ringing_active'] else '❌ INACTIVE'}")
-        print(f"🎤 Voice Detection: {'✅ LISTENING' if status['voice_detection']['is_listening'] else '❌ STOPPED'}")
-        print(f"🗣️ Voice Detected: {'✅ YES' if status['voice_detection']['is_voice_detected'] else '❌ NO'}")
-        print(f"📞 Pending Calls: {status['pending_calls']}")
-        print(f"🔊 Voice Threshold: {status['voice_detection']['threshold_db']}dB")
-        print("="*60)
+        if status is None:
+            status = self.get_system_status()
+        
+        lines = [
+            "",
+            "="*60,
+            "📞 ENHANCED SIP DIALER STATUS",
+            "="*60,
+            f"🚀 System Running: {_YES_NO[bool(status['is_running'])]}",
+            f"📋 Accounts Configured: {_YES_NO[bool(status['accounts_configured'])]}",
+            f"📡 Registered Accounts: {list(status['registered_accounts'])}",
+            f"📳 Always Ringing: {_ACT[bool(status['always_ringing_active'])]}",
+            f"🎤 Voice Detection: {_LIS[bool(status['voice_detection']['is_listening'])]}",
+            f"🗣️ Voice Detected: {_YES_NO[bool(status['voice_detection']['is_voice_detected'])]}",
+            f"📞 Pending Calls: {status['pending_calls']}",
+            f"🔊 Voice Threshold: {status['voice_detection']['threshold_db']}dB",
+            "="*60,
+        ]
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        
+    def run_event_loop(self, cleanup_interval: float = 30):
+        """
+        Block while the dialer runs, reprinting status only when an event changes it
+        
+        Args:
+            cleanup_interval: Seconds between cleanups of old pending calls
+        """
+        last_status = None
+        next_cleanup = time.monotonic() + cleanup_interval
+        
+        while self.is_running:
+            try:
+                event = self._event_q.get(timeout=cleanup_interval)
+                self.logger.debug("Dialer event: %s", event)
+                
+                status = self.get_system_status()
+                if status != last_status:
+                    self.print_status(status)
+                    last_status = status
+            except queue.Empty:
+                pass
+            
+            if time.monotonic() >= next_cleanup:
+                self.voice_detector.cleanup_old_pending_calls()
+                next_cleanup = time.monotonic() + cleanup_interval
 
 
 def main():
@@ -205,7 +341,12 @@ def main():
     )
     
     # Create enhanced dialer
-    dialer = EnhancedSipDialer()
+    try:
+        dialer = EnhancedSipDialer()
+    except ImportError as e:
+        print(f"❌ Import error: {e}")
+        print("Please ensure all required modules are available")
+        sys.exit(1)
     
     print("🚀 ENHANCED SIP DIALER WITH VOICE DETECTION")
     print("=" * 50)
@@ -222,6 +363,10 @@ def main():
         #     password="your_password",
         #     server="your_sip_server.com"
         # )
+        #
+        # Single-account deployments can pre-bind the registration instead:
+        # dialer.specialize_single(1, "1001", "your_password", "your_sip_server.com")
+        # dialer.register_specialized()
         
         print("⚠️  Please configure your SIP accounts in the main() function")
         print("    Example:")
@@ -241,13 +386,9 @@ def main():
         #     print("   🎤 Listen for your voice")
         #     print("   📞 Auto-answer calls when you speak")
         #     
-        #     # Keep running and show status
-        #     while True:
-        #         time.sleep(10)
-        #         dialer.print_status()
-        #         
-        #         # Clean up old pending calls
-        #         dialer.voice_detector.cleanup_old_pending_calls()
+        #     # Keep running; status is reprinted whenever it changes
+        #     dialer.print_status()
+        #     dialer.run_event_loop()
         
     except KeyboardInterrupt:
         print("\n\n⏹️  Shutting down...")
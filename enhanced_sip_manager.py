@@ -5,15 +5,169 @@ Handles SIP calls with audio streaming using RTP
 """
 
 import socket
+import sys
+import ctypes
+import selectors
+import select
+import errno
+import itertools
+import logging
+import queue
 import threading
 import time
 import random
+import math
 import hashlib
+import ipaddress
 import re
 import struct
 import pyaudio
 import wave
 import os
+import numpy as np
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+# Optional: polyphase FIR resampling (linear interpolation is used without it)
+try:
+    from scipy.signal import firwin, upfirdn
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# G.711 decoding tables (128 entries, sign bit handled separately)
+_ULAW_TABLE = [
+    -32124, -31100, -30076, -29052, -28028, -27004, -25980, -24956,
+    -23932, -22908, -21884, -20860, -19836, -18812, -17788, -16764,
+    -15996, -15484, -14972, -14460, -13948, -13436, -12924, -12412,
+    -11900, -11388, -10876, -10364, -9852, -9340, -8828, -8316,
+    -7932, -7676, -7420, -7164, -6908, -6652, -6396, -6140,
+    -5884, -5628, -5372, -5116, -4860, -4604, -4348, -4092,
+    -3900, -3772, -3644, -3516, -3388, -3260, -3132, -3004,
+    -2876, -2748, -2620, -2492, -2364, -2236, -2108, -1980,
+    -1884, -1820, -1756, -1692, -1628, -1564, -1500, -1436,
+    -1372, -1308, -1244, -1180, -1116, -1052, -988, -924,
+    -876, -844, -812, -780, -748, -716, -684, -652,
+    -620, -588, -556, -524, -492, -460, -428, -396,
+    -372, -356, -340, -324, -308, -292, -276, -260,
+    -244, -228, -212, -196, -180, -164, -148, -132,
+    -120, -112, -104, -96, -88, -80, -72, -64,
+    -56, -48, -40, -32, -24, -16, -8, 0
+]
+
+_ALAW_TABLE = [
+    -5504, -5248, -6016, -5760, -4480, -4224, -4992, -4736,
+    -7552, -7296, -8064, -7808, -6528, -6272, -7040, -6784,
+    -2752, -2624, -3008, -2880, -2240, -2112, -2496, -2368,
+    -3776, -3648, -4032, -3904, -3264, -3136, -3520, -3392,
+    -22016, -20992, -24064, -23040, -17920, -16896, -19968, -18944,
+    -30208, -29184, -32256, -31232, -26112, -25088, -28160, -27136,
+    -11008, -10496, -12032, -11520, -8960, -8448, -9984, -9472,
+    -15104, -14592, -16128, -15616, -13056, -12544, -14080, -13568,
+    -344, -328, -376, -360, -280, -264, -312, -296,
+    -472, -456, -504, -488, -408, -392, -440, -424,
+    -88, -72, -120, -104, -24, -8, -56, -40,
+    -216, -200, -248, -232, -152, -136, -184, -168,
+    -1376, -1312, -1504, -1440, -1120, -1056, -1248, -1184,
+    -1888, -1824, -2016, -1952, -1632, -1568, -1760, -1696,
+    -688, -656, -752, -720, -560, -528, -624, -592,
+    -944, -912, -1008, -976, -816, -784, -880, -848
+]
+
+
+def _build_decode_lut(table, negate_when_sign_set):
+    """Expand a 128-entry G.711 table into a 256-entry int16 lookup indexed by the raw byte"""
+    lut = np.empty(256, dtype=np.int16)
+    magnitudes = np.array(table, dtype=np.int32)
+    if negate_when_sign_set:
+        lut[:128] = magnitudes
+        lut[128:] = -magnitudes
+    else:
+        lut[:128] = -magnitudes
+        lut[128:] = magnitudes
+    return lut
+
+# μ-law applies the table value as-is when the sign bit is set; A-law negates it
+_ULAW_LUT = _build_decode_lut(_ULAW_TABLE, negate_when_sign_set=False)
+_ALAW_LUT = _build_decode_lut(_ALAW_TABLE, negate_when_sign_set=True)
+
+def _segment(values, max_seg):
+    """Number of significant bits in each value, capped at max_seg"""
+    seg = np.zeros(values.shape, dtype=np.int32)
+    for k in range(max_seg):
+        seg += values >= (1 << k)
+    return seg
+
+def _build_lin2ulaw_lut():
+    """Encode every int16 sample to μ-law once; indexed by the sample's uint16 bit pattern"""
+    samples = np.arange(-32768, 32768, dtype=np.int32)
+    
+    # Bias the sample and get absolute value
+    biased = samples + 33
+    sign = np.where(biased < 0, 0x00, 0x80)
+    biased = np.minimum(np.abs(biased), 32767)
+    
+    # Find segment (logarithmic quantization) and quantization step within it
+    seg = _segment(biased >> 7, 7)
+    uval = np.where(seg == 0, (biased >> 1) & 0x0F, ((biased >> seg) & 0x0F) | 0x10)
+    
+    # Combine sign, segment, and quantization; complement for transmission
+    lut = np.empty(65536, dtype=np.uint8)
+    lut[samples & 0xFFFF] = ((sign | (seg << 4) | uval) ^ 0xFF) & 0xFF
+    return lut
+
+def _build_lin2alaw_lut():
+    """Encode every int16 sample to A-law once; indexed by the sample's uint16 bit pattern"""
+    samples = np.arange(-32768, 32768, dtype=np.int32)
+    
+    # Get absolute value and sign
+    sign = np.where(samples < 0, 0x00, 0x80)
+    magnitude = np.minimum(np.abs(samples), 32767)
+    
+    # Logarithmic quantization from 256 up, linear below
+    seg = np.maximum(_segment(magnitude >> 8, 7), 1)
+    aval = np.where(seg == 1, (magnitude >> 4) & 0x0F, (magnitude >> (seg + 3)) & 0x0F)
+    alaw = np.where(magnitude >= 256, (seg << 4) | aval, magnitude >> 4)
+    
+    # Apply sign and XOR
+    lut = np.empty(65536, dtype=np.uint8)
+    lut[samples & 0xFFFF] = ((sign | alaw) ^ 0x55) & 0xFF
+    return lut
+
+_LIN2ULAW_LUT = _build_lin2ulaw_lut()
+_LIN2ALAW_LUT = _build_lin2alaw_lut()
+
+# Float copies of the decode tables for the fused decode+resample path
+_ULAW_LUT_F = _ULAW_LUT.astype(np.float64)
+_ALAW_LUT_F = _ALAW_LUT.astype(np.float64)
+
+@lru_cache(maxsize=32)
+def _resample_plan(in_length, inrate, outrate):
+    """Linear-interpolation gather indices and weights for one frame size and rate pair"""
+    ratio = inrate / outrate
+    out_length = int(in_length / ratio)
+    positions = np.arange(out_length, dtype=np.float64) * ratio
+    lower = np.minimum(np.floor(positions).astype(np.intp), in_length - 1)
+    upper = np.minimum(lower + 1, in_length - 1)
+    # Past the last input sample hold its value, matching np.interp
+    frac = np.where(positions >= in_length - 1, 0.0, positions - lower)
+    return lower, upper, frac
+
+@lru_cache(maxsize=8)
+def _polyphase_filter(inrate, outrate, numtaps=96):
+    """Windowed-sinc low-pass for an integer-ratio rate change, or None if unsuitable"""
+    if not SCIPY_AVAILABLE:
+        return None
+    g = math.gcd(inrate, outrate)
+    up, down = outrate // g, inrate // g
+    if max(up, down) > 8:
+        # Ratios like 8000:44100 need a huge filter bank; keep linear interpolation
+        return None
+    fs = inrate * up
+    taps = firwin(numtaps, 0.9 * min(inrate, outrate) / 2, fs=fs) * up
+    # History must cover the filter span and keep the decimation phase aligned
+    history = -(-math.ceil((numtaps - 1) / up) // down) * down
+    return up, down, taps, history
 
 # Audioop replacement for Python 3.13+ compatibility
 class AudioConverter:
@@ -22,232 +176,84 @@ class AudioConverter:
     @staticmethod
     def ulaw2lin(data, width):
         """Convert μ-law (G.711 PCMU) to linear PCM"""
-        import array
-        
-        # μ-law decoding table (128 entries, sign bit handled separately)
-        ULAW_TABLE = [
-            -32124, -31100, -30076, -29052, -28028, -27004, -25980, -24956,
-            -23932, -22908, -21884, -20860, -19836, -18812, -17788, -16764,
-            -15996, -15484, -14972, -14460, -13948, -13436, -12924, -12412,
-            -11900, -11388, -10876, -10364, -9852, -9340, -8828, -8316,
-            -7932, -7676, -7420, -7164, -6908, -6652, -6396, -6140,
-            -5884, -5628, -5372, -5116, -4860, -4604, -4348, -4092,
-            -3900, -3772, -3644, -3516, -3388, -3260, -3132, -3004,
-            -2876, -2748, -2620, -2492, -2364, -2236, -2108, -1980,
-            -1884, -1820, -1756, -1692, -1628, -1564, -1500, -1436,
-            -1372, -1308, -1244, -1180, -1116, -1052, -988, -924,
-            -876, -844, -812, -780, -748, -716, -684, -652,
-            -620, -588, -556, -524, -492, -460, -428, -396,
-            -372, -356, -340, -324, -308, -292, -276, -260,
-            -244, -228, -212, -196, -180, -164, -148, -132,
-            -120, -112, -104, -96, -88, -80, -72, -64,
-            -56, -48, -40, -32, -24, -16, -8, 0
-        ]
-        
         if width != 2:
             raise ValueError("Only 16-bit linear samples supported")
             
-        result = array.array('h')  # signed 16-bit integers
-        
-        for byte in data:
-            # Extract sign bit (bit 7) and magnitude (bits 0-6)
-            sign = byte & 0x80
-            magnitude = (byte & 0x7F)
-            
-            # Get linear value from table
-            linear = ULAW_TABLE[magnitude]
-            
-            # Apply sign
-            if not sign:
-                linear = -linear
-                
-            result.append(linear)
-            
-        return result.tobytes()
+        return _ULAW_LUT[np.frombuffer(data, dtype=np.uint8)].tobytes()
     
     @staticmethod
     def alaw2lin(data, width):
         """Convert A-law (G.711 PCMA) to linear PCM"""
-        import array
-        
-        # A-law decoding table (128 entries, sign bit handled separately)
-        ALAW_TABLE = [
-            -5504, -5248, -6016, -5760, -4480, -4224, -4992, -4736,
-            -7552, -7296, -8064, -7808, -6528, -6272, -7040, -6784,
-            -2752, -2624, -3008, -2880, -2240, -2112, -2496, -2368,
-            -3776, -3648, -4032, -3904, -3264, -3136, -3520, -3392,
-            -22016, -20992, -24064, -23040, -17920, -16896, -19968, -18944,
-            -30208, -29184, -32256, -31232, -26112, -25088, -28160, -27136,
-            -11008, -10496, -12032, -11520, -8960, -8448, -9984, -9472,
-            -15104, -14592, -16128, -15616, -13056, -12544, -14080, -13568,
-            -344, -328, -376, -360, -280, -264, -312, -296,
-            -472, -456, -504, -488, -408, -392, -440, -424,
-            -88, -72, -120, -104, -24, -8, -56, -40,
-            -216, -200, -248, -232, -152, -136, -184, -168,
-            -1376, -1312, -1504, -1440, -1120, -1056, -1248, -1184,
-            -1888, -1824, -2016, -1952, -1632, -1568, -1760, -1696,
-            -688, -656, -752, -720, -560, -528, -624, -592,
-            -944, -912, -1008, -976, -816, -784, -880, -848
-        ]
-        
         if width != 2:
             raise ValueError("Only 16-bit linear samples supported")
             
-        result = array.array('h')  # signed 16-bit integers
-        
-        for byte in data:
-            # Extract sign bit (bit 7) and magnitude (bits 0-6)
-            sign = byte & 0x80
-            magnitude = (byte & 0x7F)
-            
-            # Get linear value from table
-            linear = ALAW_TABLE[magnitude]
-            
-            # Apply sign
-            if sign:
-                linear = -linear
-                
-            result.append(linear)
-            
-        return result.tobytes()
+        return _ALAW_LUT[np.frombuffer(data, dtype=np.uint8)].tobytes()
     
     @staticmethod
     def lin2ulaw(data, width):
         """Convert linear PCM to μ-law (G.711 PCMU)"""
-        import array
-        
         if width != 2:
             raise ValueError("Only 16-bit linear samples supported")
             
-        # Convert bytes to signed 16-bit integers
-        samples = array.array('h')
-        samples.frombytes(data)
-        
-        result = bytearray()
-        
-        for sample in samples:
-            # Bias the sample and get absolute value
-            biased = sample + 33
-            if biased < 0:
-                biased = -biased
-                sign = 0x00
-            else:
-                sign = 0x80
-                
-            # Clip to prevent overflow
-            if biased > 32767:
-                biased = 32767
-                
-            # Find segment (logarithmic quantization)
-            seg = 0
-            temp = biased >> 7
-            while temp != 0 and seg < 7:
-                seg += 1
-                temp >>= 1
-                
-            # Get quantization step within segment
-            if seg == 0:
-                uval = (biased >> 1) & 0x0F
-            else:
-                uval = ((biased >> seg) & 0x0F) | 0x10
-                
-            # Combine sign, segment, and quantization
-            ulaw_byte = sign | (seg << 4) | uval
-            
-            # Complement for transmission
-            result.append(ulaw_byte ^ 0xFF)
-            
-        return bytes(result)
+        return _LIN2ULAW_LUT[np.frombuffer(data, dtype=np.int16).view(np.uint16)].tobytes()
     
     @staticmethod
     def lin2alaw(data, width):
         """Convert linear PCM to A-law (G.711 PCMA)"""
-        import array
-        
         if width != 2:
             raise ValueError("Only 16-bit linear samples supported")
             
-        # Convert bytes to signed 16-bit integers
-        samples = array.array('h')
-        samples.frombytes(data)
-        
-        result = bytearray()
-        
-        for sample in samples:
-            # Get absolute value and sign
-            if sample < 0:
-                sample = -sample
-                sign = 0x00
-            else:
-                sign = 0x80
-                
-            # Clip to prevent overflow
-            if sample > 32767:
-                sample = 32767
-                
-            # Compress using A-law algorithm
-            if sample >= 256:
-                # Find segment (logarithmic quantization)
-                seg = 1
-                temp = sample >> 8
-                while temp != 1 and seg < 7:
-                    seg += 1
-                    temp >>= 1
-                    
-                # Get quantization step within segment
-                if seg == 1:
-                    aval = (sample >> 4) & 0x0F
-                else:
-                    aval = (sample >> (seg + 3)) & 0x0F
-                    
-                # Combine segment and quantization
-                alaw_byte = (seg << 4) | aval
-            else:
-                # Linear quantization for small values
-                alaw_byte = sample >> 4
-                
-            # Apply sign and XOR
-            result.append((sign | alaw_byte) ^ 0x55)
-            
-        return bytes(result)
+        return _LIN2ALAW_LUT[np.frombuffer(data, dtype=np.int16).view(np.uint16)].tobytes()
     
     @staticmethod
     def ratecv(fragment, width, nchannels, inrate, outrate, state):
         """Basic sample rate conversion using linear interpolation"""
-        import array
-        
         if width != 2 or nchannels != 1:
             raise ValueError("Only 16-bit mono samples supported")
             
         if inrate == outrate:
             return fragment, state
             
-        # Convert to array of samples
-        in_samples = array.array('h')
-        in_samples.frombytes(fragment)
+        in_samples = np.frombuffer(fragment, dtype=np.int16)
+        if len(in_samples) == 0:
+            return b"", None
         
-        # Calculate conversion ratio
-        ratio = inrate / outrate
-        out_length = int(len(in_samples) / ratio)
+        # Polyphase FIR when available; state carries the input history between frames
+        plan = _polyphase_filter(inrate, outrate)
+        if plan is not None and (len(in_samples) * plan[0]) % plan[1] == 0:
+            up, down, taps, history = plan
+            if state is None or len(state) != history:
+                state = np.zeros(history, dtype=np.float64)
+            extended = np.concatenate((state, in_samples))
+            filtered = upfirdn(taps, extended, up, down)
+            start = history * up // down
+            filtered = filtered[start:start + len(in_samples) * up // down]
+            out_samples = np.clip(np.rint(filtered), -32768, 32767).astype(np.int16)
+            return out_samples.tobytes(), extended[-history:]
         
-        # Simple linear interpolation
-        out_samples = array.array('h')
-        for i in range(out_length):
-            # Calculate corresponding input position
-            pos = i * ratio
-            idx = int(pos)
-            frac = pos - idx
-            
-            if idx + 1 < len(in_samples):
-                # Linear interpolation between two samples
-                sample = int(in_samples[idx] * (1 - frac) + in_samples[idx + 1] * frac)
-            else:
-                # Use last sample if at end
-                sample = in_samples[idx] if idx < len(in_samples) else 0
-                
-            out_samples.append(sample)
-            
-        return out_samples.tobytes(), None
+        # Linear interpolation at each output position (past the end holds the last sample)
+        lower, upper, frac = _resample_plan(len(in_samples), inrate, outrate)
+        low = in_samples[lower].astype(np.float64)
+        out_samples = (in_samples[upper] - low) * frac + low
+        return out_samples.astype(np.int16).tobytes(), None
+    
+    @staticmethod
+    def g711_decode_resampled(data, alaw, inrate, outrate):
+        """Decode G.711 straight to linear PCM at outrate without an intermediate 8kHz buffer"""
+        codes = np.frombuffer(data, dtype=np.uint8)
+        if inrate == outrate or len(codes) == 0:
+            return (_ALAW_LUT if alaw else _ULAW_LUT)[codes].tobytes()
+        
+        # Integer upsampling (16k/24k/32k/48k devices): repeat samples and let the driver's resampler smooth
+        if outrate % inrate == 0:
+            return (_ALAW_LUT if alaw else _ULAW_LUT)[codes].repeat(outrate // inrate).tobytes()
+        
+        # Gather the codes either side of each output position, then decode and blend
+        lower, upper, frac = _resample_plan(len(codes), inrate, outrate)
+        table = _ALAW_LUT_F if alaw else _ULAW_LUT_F
+        low = table[codes[lower]]
+        out_samples = (table[codes[upper]] - low) * frac + low
+        return out_samples.astype(np.int16).tobytes()
 
 # Create compatibility layer
 audioop = AudioConverter()
@@ -255,9 +261,15 @@ from typing import Dict, Optional, Callable, List
 from working_sip_manager import WorkingSipManager
 from audio_device_manager import AudioDeviceManager
 
+# Per-call SIP events log here (debug for progress, warning for failures) instead of print
+_log = logging.getLogger(__name__)
+
 class EnhancedRTPManager:
     """Enhanced RTP Manager with per-account audio device support"""
     
+    # Decoded frames queued per call for playback (10 x 20ms)
+    _PLAYBACK_FRAMES = 10
+    
     def __init__(self, audio_device_manager: AudioDeviceManager):
         self.audio_device_manager = audio_device_manager
         self.active_streams = {}
@@ -265,6 +277,22 @@ class EnhancedRTPManager:
         self.chunk_size = 160    # 20ms at 8kHz
         self.format = pyaudio.paInt16
         self.channels = 1
+        
+        # Encoded G.711 silence, sent when a frame cannot be converted
+        silence = b"\x00\x00" * self.chunk_size
+        self._silence_ulaw = audioop.lin2ulaw(silence, 2)
+        self._silence_alaw = audioop.lin2alaw(silence, 2)
+        
+        # All RTP sockets are received on one shared thread (started on demand)
+        self._selector = selectors.DefaultSelector()
+        self._rx_lock = threading.Lock()
+        self._rx_thread = None
+        # Packets are received into one reused buffer; safe because only the RX thread touches it
+        self._rx_buf = bytearray(4096)
+        self._rx_view = memoryview(self._rx_buf)
+        
+        # Scatter-gather send lets the kernel join header and payload (not available on Windows)
+        self._use_sendmsg = hasattr(socket.socket, 'sendmsg')
 
     def set_main_process_mixer_name(self, display_name: str, retries: int = 10, delay: float = 0.3) -> bool:
         """Set the Windows Volume Mixer display name for the current process's audio session.
@@ -317,6 +345,7 @@ class EnhancedRTPManager:
             
             # Create RTP socket
             rtp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._tune_rtp_socket(rtp_socket)
             # Bind with small retry in case of recent reuse
             bind_ok = False
             bind_port = local_port
@@ -334,9 +363,13 @@ class EnhancedRTPManager:
             if not bind_ok:
                 raise OSError("Failed to bind RTP socket")
             
+            # Decoded PCM waiting for the speaker; bounded so a stalled device drops old audio.
+            # The output stream runs in callback mode and pulls from it, so playback needs no thread
+            playback = queue.Queue(maxsize=self._PLAYBACK_FRAMES)
+            
             # Create audio streams for this account using the AudioDeviceManager
             input_stream, output_stream, device_rate, device_chunk = self.audio_device_manager.create_audio_streams(
-                account_id, self.sample_rate, self.chunk_size
+                account_id, self.sample_rate, self.chunk_size, output_callback=self._make_playback_callback(playback)
             )
             if not input_stream or not output_stream:
                 try:
@@ -351,6 +384,10 @@ class EnhancedRTPManager:
             if not device_chunk:
                 device_chunk = self.chunk_size
             
+            ssrc = random.randint(1, 0xFFFFFFFF)
+            codec = codec.upper() if isinstance(codec, str) else 'PCMU'
+            is_alaw = codec == 'PCMA'
+            
             stream_info = {
                 'socket': rtp_socket,
                 'input_stream': input_stream,
@@ -360,35 +397,42 @@ class EnhancedRTPManager:
                 'output_device_id': output_device_id,
                 'remote_ip': remote_ip,
                 'remote_port': remote_port,
+                'remote_addr': (remote_ip, remote_port),
                 'local_port': bind_port,
                 'sequence': 0,
                 'timestamp': 0,
-                'ssrc': random.randint(1, 0xFFFFFFFF),
+                'ssrc': ssrc,
+                # Reused TX packet buffer: header template followed by room for one payload
+                'tx_buf': self._create_rtp_header_template(ssrc, payload_type, 2 * self.chunk_size),
                 'running': True,
                 'payload_type': payload_type,
-                'codec': codec.upper() if isinstance(codec, str) else 'PCMU',
+                'codec': codec,
+                # Encoder and fallback silence resolved once for the negotiated codec
+                'encode': audioop.lin2alaw if is_alaw else audioop.lin2ulaw,
+                'silence': self._silence_alaw if is_alaw else self._silence_ulaw,
                 'tx_count': 0,
                 'rx_count': 0,
                 'device_rate': device_rate,
                 'device_chunk': device_chunk,
+                'playback': playback,
             }
             
             self.active_streams[call_id] = stream_info
             
-            # Start send/receive threads
+            # Start send thread (paced by the blocking microphone read)
             send_thread = threading.Thread(
                 target=self._send_audio_thread, 
                 args=(call_id,), 
                 daemon=True
             )
-            receive_thread = threading.Thread(
-                target=self._receive_audio_thread, 
-                args=(call_id,), 
-                daemon=True
-            )
-            
             send_thread.start()
-            receive_thread.start()
+            
+            # Hand the socket to the shared receive loop
+            with self._rx_lock:
+                self._selector.register(rtp_socket, selectors.EVENT_READ, data=call_id)
+                if self._rx_thread is None:
+                    self._rx_thread = threading.Thread(target=self._receive_loop, daemon=True)
+                    self._rx_thread.start()
             
             # Friendly names for logs
             try:
@@ -414,6 +458,13 @@ class EnhancedRTPManager:
             stream = self.active_streams[call_id]
             stream['running'] = False
             
+            # Stop receiving on this socket before it is closed
+            with self._rx_lock:
+                try:
+                    self._selector.unregister(stream['socket'])
+                except (KeyError, ValueError):
+                    pass
+            
             # Close audio streams and socket
             try:
                 inp = stream.get('input_stream')
@@ -446,6 +497,20 @@ class EnhancedRTPManager:
             del self.active_streams[call_id]
             print(f"RTP stream stopped for call {call_id}")
             
+    def _tune_rtp_socket(self, sock: socket.socket):
+        """Enlarge socket buffers and mark packets as Expedited Forwarding (DSCP 46)"""
+        options = (
+            (socket.SOL_SOCKET, socket.SO_SNDBUF, 256 * 1024),
+            (socket.SOL_SOCKET, socket.SO_RCVBUF, 256 * 1024),
+            (socket.IPPROTO_IP, socket.IP_TOS, 0xB8),
+        )
+        for level, option, value in options:
+            try:
+                sock.setsockopt(level, option, value)
+            except OSError:
+                # Best effort: some platforms cap buffers or ignore TOS
+                pass
+        
     def _send_audio_thread(self, call_id: int):
         """Thread for sending audio via RTP"""
         if call_id not in self.active_streams:
@@ -453,19 +518,37 @@ class EnhancedRTPManager:
             
         stream = self.active_streams[call_id]
         
-        while stream['running']:
-            try:
+        # Per-call constants and counters live in locals for the life of the loop;
+        # counters are written back to the stream when the loop ends
+        sock = stream['socket']
+        remote_addr = stream['remote_addr']
+        input_stream = stream['input_stream']
+        tx_buf = stream['tx_buf']
+        tx_header = memoryview(tx_buf)[:12]
+        use_sendmsg = self._use_sendmsg
+        encode = stream['encode']
+        silence = stream['silence']
+        dev_chunk = int(stream.get('device_chunk') or self.chunk_size)
+        dev_rate = int(stream.get('device_rate') or self.sample_rate)
+        sequence = stream['sequence']
+        timestamp = stream['timestamp']
+        tx_count = stream['tx_count']
+        log_tx = tx_count < 5  # Only the first few packets are logged
+        ratecv_state = None
+        
+        # Pace packets against absolute 20ms deadlines so processing time doesn't add drift
+        frame_interval = 0.02
+        next_deadline = time.monotonic() + frame_interval
+        
+        try:
+            while stream['running']:
                 # Read audio from microphone at device rate
-                dev_chunk = int(stream.get('device_chunk') or self.chunk_size)
-                dev_rate = int(stream.get('device_rate') or self.sample_rate)
-                audio_data = stream['input_stream'].read(
-                    dev_chunk, exception_on_overflow=False
-                )
+                audio_data = input_stream.read(dev_chunk, exception_on_overflow=False)
                 # If device rate != RTP rate, downsample to 8kHz for encoding
                 if dev_rate != self.sample_rate:
                     try:
-                        # audioop.ratecv returns (converted_data, state)
-                        converted, _ = audioop.ratecv(audio_data, 2, 1, dev_rate, self.sample_rate, None)
+                        # audioop.ratecv returns (converted_data, state); the state keeps the filter continuous
+                        converted, ratecv_state = audioop.ratecv(audio_data, 2, 1, dev_rate, self.sample_rate, ratecv_state)
                         pcm8 = converted
                     except Exception as rerr:
                         # On failure, fall back to silence for this frame
@@ -474,105 +557,129 @@ class EnhancedRTPManager:
                     pcm8 = audio_data
                 # Convert 16-bit PCM -> G.711 (mu-law or A-law) based on negotiated codec
                 try:
-                    if stream.get('codec', 'PCMU') == 'PCMA':
-                        payload = audioop.lin2alaw(pcm8, 2)
-                    else:
-                        payload = audioop.lin2ulaw(pcm8, 2)
-                except Exception as conv_err:
+                    payload = encode(pcm8, 2)
+                except Exception:
                     # On failure, send encoded silence rather than raw PCM to avoid static
-                    silence = b"\x00\x00" * self.chunk_size
-                    try:
-                        payload = audioop.lin2ulaw(silence, 2)
-                    except Exception:
-                        # Give up on this frame
-                        print(f"G.711 encode failed (call {call_id}): {conv_err}")
-                        time.sleep(0.02)
-                        continue
+                    payload = silence
                 
-                # Create RTP packet
-                rtp_packet = self._create_rtp_packet(
-                    stream['sequence'],
-                    stream['timestamp'],
-                    stream['ssrc'],
-                    payload,
-                    stream.get('payload_type', 0)
-                )
-                
-                # Send to remote
-                stream['socket'].sendto(
-                    rtp_packet,
-                    (stream['remote_ip'], stream['remote_port'])
-                )
+                # Create RTP packet and send to remote
+                if use_sendmsg:
+                    self._stamp_rtp_header(tx_buf, sequence, timestamp)
+                    sock.sendmsg((tx_header, payload), (), 0, remote_addr)
+                else:
+                    rtp_packet = self._create_rtp_packet(tx_buf, sequence, timestamp, payload)
+                    sock.sendto(rtp_packet, remote_addr)
                 
                 # Update sequence and timestamp
-                stream['sequence'] = (stream['sequence'] + 1) & 0xFFFF
-                stream['timestamp'] = (stream['timestamp'] + self.chunk_size) & 0xFFFFFFFF
-                stream['tx_count'] += 1
-                if stream['tx_count'] <= 5:
-                    print(f"RTP TX call {call_id}: PT={stream.get('payload_type',0)} seq={stream['sequence']} ts={stream['timestamp']} bytes={len(payload)} -> {stream['remote_ip']}:{stream['remote_port']}")
+                sequence = (sequence + 1) & 0xFFFF
+                timestamp = (timestamp + self.chunk_size) & 0xFFFFFFFF
+                tx_count += 1
+                if log_tx:
+                    log_tx = tx_count < 5
+                    print(f"RTP TX call {call_id}: PT={stream.get('payload_type',0)} seq={sequence} ts={timestamp} bytes={len(payload)} -> {remote_addr[0]}:{remote_addr[1]}")
                 
-                # Sleep for packet timing (20ms)
-                time.sleep(0.02)
+                # Sleep until this packet's deadline (20ms spacing)
+                now = time.monotonic()
+                sleep_for = next_deadline - now
+                if sleep_for > 0:
+                    time.sleep(sleep_for)
+                    next_deadline += frame_interval
+                elif sleep_for < -0.1:
+                    # Fell more than 100ms behind; resync instead of bursting to catch up
+                    next_deadline = now + frame_interval
+                else:
+                    next_deadline += frame_interval
                 
-            except Exception as e:
-                if stream['running']:
-                    print(f"Error in send audio thread for call {call_id}: {e}")
-                break
+        except Exception as e:
+            if stream['running']:
+                print(f"Error in send audio thread for call {call_id}: {e}")
+        finally:
+            stream['sequence'] = sequence
+            stream['timestamp'] = timestamp
+            stream['tx_count'] = tx_count
                 
-    def _receive_audio_thread(self, call_id: int):
-        """Thread for receiving audio via RTP"""
-        if call_id not in self.active_streams:
-            return
-            
-        stream = self.active_streams[call_id]
-        stream['socket'].settimeout(1.0)
+    def _make_playback_callback(self, playback: queue.Queue):
+        """Build a PyAudio output callback that plays frames queued by the receive loop"""
+        pending = bytearray()
+        
+        def callback(in_data, frame_count, time_info, status):
+            need = frame_count * 2
+            while len(pending) < need:
+                try:
+                    pending.extend(playback.get_nowait())
+                except queue.Empty:
+                    # Underrun: pad with silence rather than stall the device
+                    pending.extend(bytes(need - len(pending)))
+            out = bytes(pending[:need])
+            del pending[:need]
+            return (out, pyaudio.paContinue)
         
-        while stream['running']:
+        return callback
+        
+    def _receive_loop(self):
+        """Shared thread receiving RTP for every active stream"""
+        while True:
+            with self._rx_lock:
+                if not self._selector.get_map():
+                    # No streams left; a new stream starts a fresh loop
+                    self._rx_thread = None
+                    return
             try:
-                # Receive RTP packet
-                packet, addr = stream['socket'].recvfrom(4096)
+                events = self._selector.select(timeout=0.5)
+            except (OSError, ValueError):
+                # A socket was closed while selecting; re-check the registered set
+                continue
+            for key, _ in events:
+                self._handle_rx(key.data, key.fileobj)
                 
-                # Parse RTP packet, extract payload type and audio
-                pt, audio_data = self._parse_rtp_header_and_payload(packet)
-                if audio_data and pt in (0, 8):
-                    # Convert G.711 to 16-bit PCM before playback based on payload type
+    def _handle_rx(self, call_id: int, sock: socket.socket):
+        """Receive and decode one RTP packet for a call"""
+        stream = self.active_streams.get(call_id)
+        if stream is None or not stream['running']:
+            return
+            
+        try:
+            # Receive RTP packet into the shared buffer; the payload is consumed before the next receive
+            nbytes, addr = sock.recvfrom_into(self._rx_buf, 4096)
+            packet = self._rx_view[:nbytes]
+            
+            # Parse RTP packet, extract payload type and audio
+            pt, audio_data = self._parse_rtp_header_and_payload(packet)
+            if audio_data and pt in (0, 8):
+                # Convert G.711 (PCMA=8, PCMU=0) to 16-bit PCM at the device rate in one pass
+                dev_rate = int(stream.get('device_rate') or self.sample_rate)
+                try:
+                    pcm = audioop.g711_decode_resampled(audio_data, pt == 8, self.sample_rate, dev_rate)
+                except Exception as dec_err:
+                    # Drop frame to avoid static
+                    print(f"G.711 decode failed (call {call_id}): {dec_err}")
+                    return
+                # Queue for the output callback; drop the oldest frame if playback is behind
+                playback = stream['playback']
+                try:
+                    playback.put_nowait(pcm)
+                except queue.Full:
                     try:
-                        if pt == 8:  # PCMA
-                            pcm = audioop.alaw2lin(audio_data, 2)
-                        else:       # PCMU (0)
-                            pcm = audioop.ulaw2lin(audio_data, 2)
-                    except Exception as dec_err:
-                        # Drop frame to avoid static
-                        print(f"G.711 decode failed (call {call_id}): {dec_err}")
-                        continue
-                    # If device rate != RTP rate, upsample from 8k to device rate for playback
-                    dev_rate = int(stream.get('device_rate') or self.sample_rate)
-                    if dev_rate != self.sample_rate:
-                        try:
-                            pcm, _ = audioop.ratecv(pcm, 2, 1, self.sample_rate, dev_rate, None)
-                        except Exception as rerr:
-                            # On failure, write the 8k data directly (driver may resample) or skip
-                            pass
-                    # Play audio through speaker
-                    stream['output_stream'].write(pcm)
-                    stream['rx_count'] += 1
-                    if stream['rx_count'] <= 5:
-                        print(f"RTP RX call {call_id}: PT={pt} bytes={len(audio_data)} from {addr}")
-                elif audio_data and pt not in (0, 8):
-                    # Ignore non-G711 payloads like telephone-event (DTMF)
-                    stream['rx_count'] += 1
-                    if stream['rx_count'] <= 3:
-                        print(f"RTP RX call {call_id}: Ignoring PT={pt} bytes={len(audio_data)} (non-G711)")
-                    
-            except socket.timeout:
-                continue
-            except Exception as e:
-                if stream['running']:
-                    print(f"Error in receive audio thread for call {call_id}: {e}")
-                break
+                        playback.get_nowait()
+                    except queue.Empty:
+                        pass
+                    playback.put_nowait(pcm)
+                stream['rx_count'] += 1
+                if stream['rx_count'] <= 5:
+                    print(f"RTP RX call {call_id}: PT={pt} bytes={len(audio_data)} from {addr}")
+            elif audio_data and pt not in (0, 8):
+                # Ignore non-G711 payloads like telephone-event (DTMF)
+                stream['rx_count'] += 1
+                if stream['rx_count'] <= 3:
+                    print(f"RTP RX call {call_id}: Ignoring PT={pt} bytes={len(audio_data)} (non-G711)")
                 
-    def _create_rtp_packet(self, sequence: int, timestamp: int, ssrc: int, payload: bytes, payload_type: int) -> bytes:
-        """Create RTP packet with audio payload"""
+        except Exception as e:
+            if stream['running']:
+                print(f"Error receiving audio for call {call_id}: {e}")
+                
+    def _create_rtp_header_template(self, ssrc: int, payload_type: int, payload_room: int = 0) -> bytearray:
+        """Create a stream's TX buffer: the 12-byte RTP header with its constant fields
+        filled in, followed by payload_room bytes for the payload"""
         # RTP Header (12 bytes)
         # V(2) + P(1) + X(1) + CC(4) = 8 bits
         # M(1) + PT(7) = 8 bits  (PT=0 for PCMU, PT=8 for PCMA)
@@ -585,23 +692,44 @@ class EnhancedRTPManager:
         cc = 0
         marker = 0
         pt = int(payload_type) if payload_type in (0, 8) else 0
-        header = struct.pack(
-            '>BBHII',
+        header = bytearray(12 + payload_room)
+        struct.pack_into(
+            '>BBHII', header, 0,
             (version << 6) | (padding << 5) | (extension << 4) | cc,
             (marker << 7) | pt,
-            sequence & 0xFFFF,
-            timestamp & 0xFFFFFFFF,
+            0,
+            0,
             ssrc & 0xFFFFFFFF,
         )
-        return header + payload
+        return header
+        
+    def _stamp_rtp_header(self, tx_buf: bytearray, sequence: int, timestamp: int):
+        """Write sequence number and timestamp into a header template in place"""
+        struct.pack_into('>HI', tx_buf, 2, sequence & 0xFFFF, timestamp & 0xFFFFFFFF)
+        
+    def _create_rtp_packet(self, tx_buf: bytearray, sequence: int, timestamp: int, payload: bytes):
+        """Create RTP packet in the stream's TX buffer; returns a view valid until the next call"""
+        self._stamp_rtp_header(tx_buf, sequence, timestamp)
+        end = 12 + len(payload)
+        if end > len(tx_buf):
+            # Oversized frame: fall back to a one-off packet
+            return bytes(tx_buf[:12]) + payload
+        tx_buf[12:end] = payload
+        return memoryview(tx_buf)[:end]
         
     def _parse_rtp_header_and_payload(self, packet: bytes) -> tuple[int, Optional[bytes]]:
         """Parse RTP header, return (payload_type, payload) handling CSRC, extensions, and padding."""
         try:
             if len(packet) < 12:
                 return (0, None)
-            b1, b2, seq, ts, ssrc = struct.unpack('>BBHII', packet[:12])
-            version = (b1 >> 6) & 0x03
+            # Fast path: version 2 with no padding, extension, CSRCs or marker is a plain 12-byte header
+            if packet[0] == 0x80:
+                b2 = packet[1]
+                if b2 < 0x80:
+                    return (b2, packet[12:] if len(packet) > 12 else None)
+            # Only the first two bytes are needed; sequence, timestamp and SSRC are unused on receive
+            b1 = packet[0]
+            b2 = packet[1]
             padding = (b1 >> 5) & 0x01
             extension = (b1 >> 4) & 0x01
             csrc_count = b1 & 0x0F
@@ -617,7 +745,7 @@ class EnhancedRTPManager:
             if extension:
                 if len(packet) < offset + 4:
                     return (pt, None)
-                ext_profile, ext_len_words = struct.unpack('>HH', packet[offset:offset+4])
+                ext_len_words = (packet[offset + 2] << 8) | packet[offset + 3]
                 offset += 4
                 ext_len_bytes = ext_len_words * 4
                 if len(packet) < offset + ext_len_bytes:
@@ -641,6 +769,238 @@ class EnhancedRTPManager:
             self.stop_rtp_stream(call_id)
         self.audio_device_manager.cleanup()
 
+# SIP response templates, filled with a single %-format per message
+_SIP_RESPONSE_TMPL = (
+    "SIP/2.0 %s\r\n"
+    "Via: %s\r\n"
+    "From: %s\r\n"
+    "To: %s\r\n"
+    "Call-ID: %s\r\n"
+    "CSeq: %s\r\n"
+    "Content-Length: 0\r\n"
+    "\r\n"
+)
+
+_SIP_RESPONSE_CONTACT_TMPL = (
+    "SIP/2.0 %s\r\n"
+    "Via: %s\r\n"
+    "From: %s\r\n"
+    "To: %s\r\n"
+    "Call-ID: %s\r\n"
+    "CSeq: %s\r\n"
+    "Contact: <sip:%s:5060>\r\n"
+    "Content-Length: 0\r\n"
+    "\r\n"
+)
+
+_OPTIONS_OK_TMPL = (
+    "SIP/2.0 200 OK\r\n"
+    "Via: %s\r\n"
+    "From: %s\r\n"
+    "To: %s\r\n"
+    "Call-ID: %s\r\n"
+    "CSeq: %s\r\n"
+    "Contact: <sip:%s:5060>\r\n"
+    "Allow: INVITE, ACK, CANCEL, BYE, OPTIONS\r\n"
+    "Content-Length: 0\r\n"
+    "\r\n"
+)
+
+_SDP_ANSWER_TMPL = (
+    "v=0\r\n"
+    "o=user 123456 123456 IN IP4 %s\r\n"
+    "s=-\r\n"
+    "c=IN IP4 %s\r\n"
+    "t=0 0\r\n"
+    "m=audio %d RTP/AVP %d\r\n"
+    "a=rtpmap:%d %s/8000\r\n"
+    "a=sendrecv\r\n"
+)
+
+_OK_WITH_SDP_TMPL = (
+    "SIP/2.0 200 OK\r\n"
+    "Via: %s\r\n"
+    "From: %s\r\n"
+    "To: %s\r\n"
+    "Call-ID: %s\r\n"
+    "CSeq: %s\r\n"
+    "Contact: <sip:%s:5060>\r\n"
+    "Content-Type: application/sdp\r\n"
+    "Content-Length: %d\r\n"
+    "\r\n"
+    "%s"
+)
+
+# Outgoing INVITE with a PCMU/PCMA offer; the optional header slot carries Authorization
+_SDP_OFFER_TMPL = (
+    "v=0\r\n"
+    "o=%s %d %d IN IP4 %s\r\n"
+    "s=SIP Call\r\n"
+    "c=IN IP4 %s\r\n"
+    "t=0 0\r\n"
+    "m=audio %d RTP/AVP 0 8\r\n"
+    "a=rtpmap:0 PCMU/8000\r\n"
+    "a=rtpmap:8 PCMA/8000\r\n"
+    "a=sendrecv\r\n"
+)
+
+_INVITE_TMPL = (
+    "INVITE sip:%s@%s SIP/2.0\r\n"
+    "Via: SIP/2.0/UDP %s:%d;branch=%s\r\n"
+    "Max-Forwards: 70\r\n"
+    "From: <sip:%s@%s>;tag=%s\r\n"
+    "To: <sip:%s@%s>\r\n"
+    "Call-ID: %s\r\n"
+    "CSeq: %d INVITE\r\n"
+    "Contact: <sip:%s@%s:%d>\r\n"
+    "%s"
+    "Content-Type: application/sdp\r\n"
+    "Content-Length: %d\r\n"
+    "User-Agent: EnhancedSipDialer/1.0\r\n"
+    "\r\n"
+    "%s"
+)
+
+# In-dialog requests we originate (ACK, BYE); the method appears in the request line and CSeq
+_IN_DIALOG_TMPL = (
+    "%s sip:%s@%s SIP/2.0\r\n"
+    "Via: SIP/2.0/UDP %s:5060;branch=%s\r\n"
+    "Max-Forwards: 70\r\n"
+    "From: <sip:%s@%s>;tag=%s\r\n"
+    "To: <sip:%s@%s>;tag=%s\r\n"
+    "Call-ID: %s\r\n"
+    "CSeq: %d %s\r\n"
+    "Content-Length: 0\r\n"
+    "\r\n"
+)
+
+# Answer parsing: compiled once, matched over the whole SDP body instead of per line
+_TO_TAG_RE = re.compile(r'^[ \t]*To[ \t]*:[^\r\n]*?tag=([^;>\s]+)', re.M | re.I)
+# Call-ID (or compact i) of a raw datagram, used to hand responses to the call waiting for them
+_CALL_ID_BYTES_RE = re.compile(rb'^[ \t]*(?:Call-ID|i)[ \t]*:[ \t]*([^\r\n]*?)[ \t]*\r?$', re.M | re.I)
+_CSEQ_NUM_RE = re.compile(r'^[ \t]*CSeq[ \t]*:[ \t]*(\d+)(?=\s|$)', re.M | re.I)
+_SDP_CONN_RE = re.compile(r'^[ \t]*c=IN IP4 [^\r\n]*?(\S+)[ \t]*\r?$', re.M)
+_SDP_MAUDIO_RE = re.compile(r'^[ \t]*m=audio (\d+)[ \t]+\S+([^\r\n]*)', re.M)
+_SDP_RTPMAP_RE = re.compile(r'^[ \t]*a=rtpmap:(\d+)[ \t]+([^/\s]+)', re.M)
+
+# Batched UDP send via sendmmsg(2) on Linux; other platforms send datagrams one at a time
+class _IOVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.POINTER(_IOVec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr), ('msg_len', ctypes.c_uint)]
+
+_libc = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL("libc.so.6", use_errno=True)
+        _libc.sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int]
+        _libc.sendmmsg.restype = ctypes.c_int
+        _libc.recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+        _libc.recvmmsg.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        _libc = None
+
+_MSG_DONTWAIT = 0x40
+
+def _sockaddr_in(addr: tuple) -> bytes:
+    """Pack an (ip, port) tuple as a struct sockaddr_in"""
+    return struct.pack('=H', socket.AF_INET) + struct.pack('!H', addr[1]) + socket.inet_aton(addr[0]) + b'\x00' * 8
+
+# Peers (trunks, SBCs) repeat the same few SDP addresses, so classification is cached
+@lru_cache(maxsize=1024)
+def _ip_is_global(ip: str) -> bool:
+    try:
+        return ipaddress.ip_address(ip).is_global
+    except ValueError:
+        return False
+
+# SIP identifiers straight from os.urandom (one C call per id)
+def _tag() -> str:
+    """Random From/To tag"""
+    return os.urandom(4).hex()
+
+# Branches only need to be unique per transaction: a counter mixed with a per-process salt
+_branch_seq = itertools.count()
+_BRANCH_SALT = int.from_bytes(os.urandom(4), 'big')
+
+def _branch() -> str:
+    """Unique RFC 3261 Via branch"""
+    return 'z9hG4bK%08x' % ((next(_branch_seq) ^ _BRANCH_SALT) & 0xffffffff)
+
+def _session_id() -> int:
+    """Random SDP o= session id/version"""
+    return int.from_bytes(os.urandom(4), 'big')
+
+class _RecvMmsgBatch:
+    """Reusable recvmmsg(2) buffers for one listener thread (Linux only)"""
+    
+    def __init__(self, count: int = 32, bufsize: int = 4096):
+        self.count = count
+        self.buffers = [ctypes.create_string_buffer(bufsize) for _ in range(count)]
+        self.names = [ctypes.create_string_buffer(16) for _ in range(count)]
+        # Datagrams are handed out as views; they stay valid until the next recv()
+        self.views = [memoryview(buf).cast('B') for buf in self.buffers]
+        self.iovs = (_IOVec * count)()
+        self.msgs = (_MMsgHdr * count)()
+        for i in range(count):
+            self.iovs[i].iov_base = ctypes.cast(self.buffers[i], ctypes.c_void_p)
+            self.iovs[i].iov_len = bufsize
+            hdr = self.msgs[i].msg_hdr
+            hdr.msg_name = ctypes.cast(self.names[i], ctypes.c_void_p)
+            hdr.msg_iov = ctypes.pointer(self.iovs[i])
+            hdr.msg_iovlen = 1
+    
+    def recv(self, sock: socket.socket, timeout: Optional[float]) -> List[tuple]:
+        """Wait up to timeout seconds, then drain every queued datagram in one call"""
+        poller = select.poll()
+        poller.register(sock.fileno(), select.POLLIN)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if deadline is None:
+                wait_ms = None
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout("timed out")
+                wait_ms = remaining * 1000
+            if not poller.poll(wait_ms):
+                raise socket.timeout("timed out")
+            try:
+                return self.drain(sock)
+            except socket.timeout:
+                # Another reader on this socket took the datagram first; keep waiting
+                continue
+
+    def drain(self, sock: socket.socket) -> List[tuple]:
+        """Take every datagram already queued on the socket without blocking"""
+        for i in range(self.count):
+            self.msgs[i].msg_hdr.msg_namelen = 16
+        received = _libc.recvmmsg(sock.fileno(), self.msgs, self.count, _MSG_DONTWAIT, None)
+        if received < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                # Another reader took the datagram first
+                raise socket.timeout("timed out")
+            raise OSError(err, os.strerror(err))
+        packets = []
+        for i in range(received):
+            name = self.names[i].raw
+            addr = (socket.inet_ntoa(name[4:8]), struct.unpack('!H', name[2:4])[0])
+            packets.append((self.views[i][:self.msgs[i].msg_len], addr))
+        return packets
+
 class EnhancedSipManager(WorkingSipManager):
     """Enhanced SIP Manager with full call and per-account audio device support"""
     
@@ -649,29 +1009,52 @@ class EnhancedSipManager(WorkingSipManager):
         self.audio_device_manager = AudioDeviceManager()
         self.rtp_manager = EnhancedRTPManager(self.audio_device_manager)
         self.active_calls = {}
-        self.call_id_counter = 1000
-        # Map SIP Call-ID -> internal call id for incoming calls
-        self._incoming_sip_to_internal = {}
+        # Internal call ids; count.__next__ is atomic, so listener and dial threads can share it
+        self._next_call_id = itertools.count(1000).__next__
+        # Map SIP Call-ID -> call info dict (shared with active_calls) for incoming calls
+        self._sip_call_to_info = {}
+        # Answer codec preference: payload type -> (rank, default codec name); lower rank wins
+        self._codec_pref = {0: (0, 'PCMU'), 8: (1, 'PCMA')}
+        # Incoming-request listening: one selector thread for all account sockets where recvmmsg exists
+        self._sip_selector = selectors.DefaultSelector()
+        self._sip_rx_lock = threading.Lock()
+        self._sip_rx_thread = None
+        # SIP Call-ID -> queue of responses for an outgoing call still being set up; the shared
+        # listener hands over responses it reads on that call's socket
+        self._response_waiters = {}
+        # Idle response receive buffers, reused by later outgoing calls
+        self._rx_bufs = []
+        # Responses to our INVITEs keyed by status code; other 4xx-6xx fall back to _on_invite_failed
+        self._invite_status_handlers = {
+            100: self._on_invite_trying,
+            180: self._on_invite_ringing,
+            183: self._on_invite_ringing,
+            200: self._on_invite_ok,
+            401: self._on_invite_challenge,
+            404: self._on_invite_not_found,
+            408: self._on_invite_timeout,
+            486: self._on_invite_busy,
+            603: self._on_invite_busy,
+        }
+        # Call state callbacks run on one worker so SIP threads never wait on UI code
+        self._state_events = queue.Queue()
+        threading.Thread(target=self._state_event_worker, daemon=True).start()
+        # App callbacks and media setup for inbound calls run here, off the shared SIP receive thread
+        self._sip_workers = ThreadPoolExecutor(max_workers=max(2, os.cpu_count() or 1))
+        # Inbound request handlers keyed by the raw method token
+        self._sip_dispatch = {
+            b'INVITE': self._handle_incoming_invite_with_media,
+            b'ACK': self._handle_incoming_ack_with_media,
+            b'BYE': self._handle_incoming_bye_with_media,
+            b'OPTIONS': self._handle_incoming_options_with_media,
+        }
+        # Digest auth memo: HA1 per credential set, response per (HA1, method, uri, nonce)
+        self._ha1_cache = {}
+        self._digest_cache = {}
         
     def _is_public_ip(self, ip: str) -> bool:
-        """Return True if IP appears publicly routable (basic RFC1918 check)."""
-        try:
-            if not ip or ip == '0.0.0.0':
-                return False
-            parts = [int(p) for p in ip.split('.')]
-            if len(parts) != 4:
-                return False
-            if parts[0] == 10:
-                return False
-            if parts[0] == 172 and 16 <= parts[1] <= 31:
-                return False
-            if parts[0] == 192 and parts[1] == 168:
-                return False
-            if parts[0] == 127:
-                return False
-            return True
-        except Exception:
-            return False
+        """Return True if IP is globally routable (IPv4 or IPv6)."""
+        return _ip_is_global(ip)
         
     def set_account_audio_devices(self, account_id: int, input_device_id: Optional[int], 
                                  output_device_id: Optional[int]):
@@ -699,26 +1082,31 @@ class EnhancedSipManager(WorkingSipManager):
     # --- Incoming call handling with media (overrides base listener) ---
     def _start_incoming_call_listener(self, account_id: int, sock: socket.socket):
         """Start background listener for incoming calls with RTP/media setup"""
+        if _libc is not None and sock.family == socket.AF_INET:
+            # recvmmsg can drain without blocking, so one selector thread serves every account
+            with self._sip_rx_lock:
+                try:
+                    self._sip_selector.register(sock, selectors.EVENT_READ, data=account_id)
+                except KeyError:
+                    # Re-registration of the same socket
+                    self._sip_selector.modify(sock, selectors.EVENT_READ, data=account_id)
+                if self._sip_rx_thread is None:
+                    self._sip_rx_thread = threading.Thread(target=self._sip_receive_loop, daemon=True)
+                    self._sip_rx_thread.start()
+            print(f"✅ Incoming call (media) listener started for account {account_id}")
+            return
+
         def listen_loop():
             try:
                 print(f"📞 Starting incoming call listener (media) for account {account_id}")
+                # Receive into one reused buffer owned by this thread
+                rx_buf = bytearray(4096)
+                rx_view = memoryview(rx_buf)
                 while account_id in self.registered_accounts:
                     try:
                         sock.settimeout(0.2)
-                        data, addr = sock.recvfrom(4096)
-                        message = data.decode('utf-8', errors='ignore')
-                        first_token = message.split()[0] if message.split() else 'UNKNOWN'
-                        if first_token == 'INVITE':
-                            self._handle_incoming_invite_with_media(account_id, message, addr, sock)
-                        elif first_token == 'ACK':
-                            self._handle_incoming_ack_with_media(account_id, message, addr, sock)
-                        elif first_token == 'BYE':
-                            self._handle_incoming_bye_with_media(account_id, message, addr, sock)
-                        elif first_token == 'OPTIONS':
-                            self._send_options_response(sock, message, addr)
-                        else:
-                            # Ignore other messages
-                            pass
+                        nbytes, addr = sock.recvfrom_into(rx_buf, 4096)
+                        self._dispatch_incoming(account_id, rx_view[:nbytes], addr, sock)
                     except socket.timeout:
                         continue
                     except Exception as e:
@@ -730,81 +1118,187 @@ class EnhancedSipManager(WorkingSipManager):
         threading.Thread(target=listen_loop, daemon=True).start()
         print(f"✅ Incoming call (media) listener started for account {account_id}")
 
+    def _sip_receive_loop(self):
+        """Shared thread receiving SIP requests for every registered account (Linux)"""
+        batch = _RecvMmsgBatch()
+        while True:
+            with self._sip_rx_lock:
+                # Drop accounts that unregistered or whose socket was replaced or closed
+                for key in list(self._sip_selector.get_map().values()):
+                    sock = key.fileobj
+                    if (key.data not in self.registered_accounts or sock.fileno() == -1
+                            or self.sockets.get(key.data) is not sock):
+                        self._sip_selector.unregister(sock)
+                if not self._sip_selector.get_map():
+                    # No accounts left; a new registration starts a fresh loop
+                    self._sip_rx_thread = None
+                    return
+            try:
+                events = self._sip_selector.select(timeout=0.2)
+            except (OSError, ValueError):
+                # A socket was closed while selecting; re-check the registered set
+                continue
+            for key, _ in events:
+                account_id, sock = key.data, key.fileobj
+                try:
+                    packets = batch.drain(sock)
+                except socket.timeout:
+                    # Another reader on this socket took the datagram first
+                    continue
+                except Exception as e:
+                    print(f"❌ Incoming loop error (acct {account_id}): {e}")
+                    continue
+                for data, addr in packets:
+                    try:
+                        self._dispatch_incoming(account_id, data, addr, sock)
+                    except Exception as e:
+                        print(f"❌ Incoming loop error (acct {account_id}): {e}")
+
+    def _notify_state(self, call_id: int, state: str, text: str):
+        """Queue a call state change for on_call_state_changed"""
+        self._state_events.put((call_id, state, text))
+
+    def _state_event_worker(self):
+        """Deliver queued call state changes in order"""
+        while True:
+            call_id, state, text = self._state_events.get()
+            callback = self.on_call_state_changed
+            if callback:
+                try:
+                    callback(call_id, state, text)
+                except Exception as e:
+                    _log.error("❌ Call state callback failed for call %s: %s", call_id, e)
+
+    def _dispatch_incoming(self, account_id: int, data: memoryview, addr: tuple, sock: socket.socket):
+        """Route one inbound datagram (a view into a reused receive buffer) to its request handler"""
+        # Identify the method from the first bytes; only requests we handle get decoded
+        parts = bytes(data[:16]).split(None, 1)
+        handler = self._sip_dispatch.get(parts[0]) if parts else None
+        if handler is None:
+            if parts and parts[0] == b'SIP/2.0':
+                # A response to one of our INVITEs read here instead of by the call's own reader
+                match = _CALL_ID_BYTES_RE.search(data)
+                waiter = self._response_waiters.get(str(match.group(1), 'utf-8', 'ignore')) if match else None
+                if waiter is not None:
+                    waiter.put((bytes(data), addr))
+            # Ignore other messages
+            return
+        # Decoding copies the datagram out, so the buffer can be reused as soon as this returns
+        handler(account_id, str(data, 'utf-8', 'ignore'), addr, sock)
+
+    def _handle_incoming_options_with_media(self, account_id: int, message: str, addr: tuple, sock: socket.socket):
+        self._send_options_response(sock, message, addr)
+
     def _send_options_response(self, sock: socket.socket, request: str, addr: tuple):
         """Send OPTIONS response"""
         try:
-            via = self._extract_header(request, 'Via') or ''
-            from_h = self._extract_header(request, 'From') or ''
-            to_h = self._extract_header(request, 'To') or ''
-            call_id = self._extract_header(request, 'Call-ID') or ''
-            cseq = self._extract_header(request, 'CSeq') or ''
+            headers = self._parse_headers(request)
+            via = headers.get('via', '')
+            from_h = headers.get('from', '')
+            to_h = headers.get('to', '')
+            call_id = headers.get('call-id', '')
+            cseq = headers.get('cseq', '')
             
-            response = f"""SIP/2.0 200 OK
-Via: {via}
-From: {from_h}
-To: {to_h}
-Call-ID: {call_id}
-CSeq: {cseq}
-Contact: <sip:{self.local_ip}:5060>
-Allow: INVITE, ACK, CANCEL, BYE, OPTIONS
-Content-Length: 0
-
-"""
+            response = _OPTIONS_OK_TMPL % (via, from_h, to_h, call_id, cseq, self.local_ip)
             sock.sendto(response.encode('utf-8'), addr)
         except Exception as e:
             print(f"Error sending OPTIONS response: {e}")
 
-    def _create_sip_response_fast(self, request: str, status: str) -> str:
+    def _sendmmsg(self, sock: socket.socket, datagrams: List[tuple]):
+        """Send several (data, addr) datagrams with one sendmmsg call, falling back to sendto"""
+        sent = 0
+        if _libc is not None and sock.family == socket.AF_INET:
+            try:
+                count = len(datagrams)
+                msgs = (_MMsgHdr * count)()
+                keep = []  # Buffers must outlive the syscall
+                for i, (data, addr) in enumerate(datagrams):
+                    buf = ctypes.create_string_buffer(data, len(data))
+                    name = ctypes.create_string_buffer(_sockaddr_in(addr), 16)
+                    iov = _IOVec(ctypes.cast(buf, ctypes.c_void_p), len(data))
+                    keep.append((buf, name, iov))
+                    hdr = msgs[i].msg_hdr
+                    hdr.msg_name = ctypes.cast(name, ctypes.c_void_p)
+                    hdr.msg_namelen = 16
+                    hdr.msg_iov = ctypes.pointer(iov)
+                    hdr.msg_iovlen = 1
+                sent = max(_libc.sendmmsg(sock.fileno(), msgs, count, 0), 0)
+            except Exception:
+                sent = 0
+        # Anything not sent in the batch (or on other platforms) goes out one by one
+        for data, addr in datagrams[sent:]:
+            sock.sendto(data, addr)
+
+    def _create_sip_response_fast(self, request: str, status: str, headers: Optional[Dict[str, str]] = None) -> str:
         """Create quick SIP response (100, 180, etc.)"""
         try:
-            via = self._extract_header(request, 'Via') or ''
-            from_h = self._extract_header(request, 'From') or ''
-            to_h = self._extract_header(request, 'To') or ''
-            call_id = self._extract_header(request, 'Call-ID') or ''
-            cseq = self._extract_header(request, 'CSeq') or ''
+            if headers is None:
+                headers = self._parse_headers(request)
+            via = headers.get('via', '')
+            from_h = headers.get('from', '')
+            to_h = headers.get('to', '')
+            call_id = headers.get('call-id', '')
+            cseq = headers.get('cseq', '')
             
-            response = f"""SIP/2.0 {status}
-Via: {via}
-From: {from_h}
-To: {to_h}
-Call-ID: {call_id}
-CSeq: {cseq}
-Content-Length: 0
-
-"""
-            return response
+            return _SIP_RESPONSE_TMPL % (status, via, from_h, to_h, call_id, cseq)
         except Exception as e:
             print(f"Error creating SIP response: {e}")
             return ""
 
-    def _create_sip_response(self, request: str, status: str) -> str:
+    def _create_sip_response(self, request: str, status: str, headers: Optional[Dict[str, str]] = None) -> str:
         """Create SIP response with proper headers"""
         try:
-            via = self._extract_header(request, 'Via') or ''
-            from_h = self._extract_header(request, 'From') or ''
-            to_h = self._extract_header(request, 'To') or ''
-            call_id = self._extract_header(request, 'Call-ID') or ''
-            cseq = self._extract_header(request, 'CSeq') or ''
+            if headers is None:
+                headers = self._parse_headers(request)
+            via = headers.get('via', '')
+            from_h = headers.get('from', '')
+            to_h = headers.get('to', '')
+            call_id = headers.get('call-id', '')
+            cseq = headers.get('cseq', '')
             
-            response = f"""SIP/2.0 {status}
-Via: {via}
-From: {from_h}
-To: {to_h}
-Call-ID: {call_id}
-CSeq: {cseq}
-Contact: <sip:{self.local_ip}:5060>
-Content-Length: 0
-
-"""
-            return response
+            return _SIP_RESPONSE_CONTACT_TMPL % (status, via, from_h, to_h, call_id, cseq, self.local_ip)
         except Exception as e:
             print(f"Error creating SIP response: {e}")
             return ""
 
+    def _parse_headers(self, message: str) -> Dict[str, str]:
+        """Parse SIP headers once into a dict keyed by lowercased name (first occurrence wins)"""
+        head, sep, _ = message.partition('\r\n\r\n')
+        if not sep:
+            head = message.partition('\n\n')[0]
+        headers = {}
+        for line in head.split('\n'):
+            idx = line.find(':')
+            if idx > 0:
+                headers.setdefault(line[:idx].strip().lower(), line[idx+1:].strip())
+        return headers
+
     def _extract_header(self, message: str, name: str) -> Optional[str]:
-        for line in message.split('\n'):
-            if line.lower().startswith(name.lower() + ':'):
-                return line.split(':', 1)[1].strip()
+        """Return the first value of a header, scanning line starts without splitting the message"""
+        # Fast path: peers almost always send the canonical casing we ask for
+        probe = name + ':'
+        if message.startswith(probe):
+            start = len(probe)
+        else:
+            start = message.find('\n' + probe)
+            if start != -1:
+                start += len(probe) + 1
+        if start != -1:
+            nl = message.find('\n', start)
+            return message[start:nl if nl != -1 else len(message)].strip()
+        name_lower = name.lower()
+        name_len = len(name_lower)
+        end = len(message)
+        pos = 0
+        while pos < end:
+            nl = message.find('\n', pos)
+            if nl == -1:
+                nl = end
+            # Only a colon right after the name can match, so compare that slice alone
+            colon = pos + name_len
+            if colon < nl and message[colon] == ':' and message[pos:colon].lower() == name_lower:
+                return message[colon+1:nl].strip()
+            pos = nl + 1
         return None
 
     def _parse_sdp_offer(self, message: str) -> Dict[str, Optional[str]]:
@@ -814,84 +1308,76 @@ Content-Length: 0
             sep = message.find('\n\n')
         if sep == -1:
             return info
-        sdp = message[sep+4:]
-        for line in sdp.split('\n'):
-            line = line.strip()
-            if line.startswith('c=IN IP4 '):
-                info['ip'] = line.split()[-1]
-            elif line.startswith('m=audio '):
-                parts = line.split()
-                if len(parts) >= 2 and parts[1].isdigit():
-                    info['port'] = int(parts[1])
+        # Walk the body line by line with find; only c=/m=/a=rtpmap lines are sliced out
+        sdp = message
+        pos = sep + 4
+        length = len(sdp)
+        while pos < length:
+            nl = sdp.find('\n', pos)
+            end = nl if nl != -1 else length
+            if sdp.startswith('c=IN IP4 ', pos, end):
+                tokens = sdp[pos+9:end].split()
+                if tokens:
+                    info['ip'] = tokens[-1]
+            elif sdp.startswith('m=audio ', pos, end):
+                # m=audio <port> <proto> <pt> <pt> ...
+                tokens = sdp[pos+8:end].split()
+                if tokens and tokens[0].isdigit():
+                    info['port'] = int(tokens[0])
                     # gather offered payload types
-                    if len(parts) > 3:
-                        for tok in parts[3:]:
-                            if tok.isdigit():
-                                info['pts'].append(int(tok))
-            elif line.startswith('a=rtpmap:'):
+                    for tok in tokens[2:]:
+                        if tok.isdigit():
+                            info['pts'].append(int(tok))
+            elif sdp.startswith('a=rtpmap:', pos, end):
                 try:
-                    after = line.split(':', 1)[1]
-                    pt_str, rest = after.split(None, 1)
-                    pt = int(pt_str)
-                    codec = rest.split('/')[0].upper()
-                    info['rtpmap'][pt] = codec
+                    pt_str, rest = sdp[pos+9:end].split(None, 1)
+                    slash = rest.find('/')
+                    codec = (rest[:slash] if slash != -1 else rest.rstrip()).upper()
+                    info['rtpmap'][int(pt_str)] = codec
                 except Exception:
                     pass
+            pos = end + 1
         return info
 
     def _create_200ok_with_sdp(self, request: str, local_rtp_port: int, payload_type: int = 0, codec: str = 'PCMU') -> str:
-        via = self._extract_header(request, 'Via') or ''
-        from_h = self._extract_header(request, 'From') or ''
-        to_h = self._extract_header(request, 'To') or ''
-        call_id = self._extract_header(request, 'Call-ID') or ''
-        cseq = self._extract_header(request, 'CSeq') or ''
+        return self._create_200ok_with_sdp_ctx(self._parse_headers(request), local_rtp_port, payload_type, codec)
+
+    def _create_200ok_with_sdp_ctx(self, ctx: Dict[str, str], local_rtp_port: int, payload_type: int = 0,
+                                   codec: str = 'PCMU') -> str:
+        """Build 200 OK + SDP from already-parsed request headers"""
+        via = ctx.get('via', '')
+        from_h = ctx.get('from', '')
+        to_h = ctx.get('to', '')
+        call_id = ctx.get('call-id', '')
+        cseq = ctx.get('cseq', '')
         # Ensure To has a tag
         if to_h and 'tag=' not in to_h:
             to_h += f";tag=resp-{int(time.time()*1000)}"
 
-        sdp = f"""v=0
-o=user 123456 123456 IN IP4 {self.local_ip}
-s=-
-c=IN IP4 {self.local_ip}
-t=0 0
-m=audio {local_rtp_port} RTP/AVP {payload_type}
-a=rtpmap:{payload_type} {codec}/8000
-a=sendrecv
-"""
-
-        lines = [
-            "SIP/2.0 200 OK",
-            f"Via: {via}",
-            f"From: {from_h}",
-            f"To: {to_h}",
-            f"Call-ID: {call_id}",
-            f"CSeq: {cseq}",
-            f"Contact: <sip:{self.local_ip}:5060>",
-            "Content-Type: application/sdp",
-            f"Content-Length: {len(sdp)}",
-            "",
-            sdp.rstrip(),
-            "",
-        ]
-        return "\n".join(lines)
+        sdp = _SDP_ANSWER_TMPL % (self.local_ip, self.local_ip, local_rtp_port, payload_type, payload_type, codec)
+        return _OK_WITH_SDP_TMPL % (via, from_h, to_h, call_id, cseq, self.local_ip, len(sdp), sdp)
 
     def _handle_incoming_invite_with_media(self, account_id: int, message: str, addr: tuple, sock: socket.socket):
         try:
-            # Basic identifiers
-            call_id_hdr = self._extract_header(message, 'Call-ID') or f"unknown-{int(time.time())}"
-            from_h = self._extract_header(message, 'From') or ''
+            # Basic identifiers (headers are parsed once and kept for the deferred 200 OK)
+            headers = self._parse_headers(message)
+            call_id_hdr = headers.get('call-id') or f"unknown-{int(time.time())}"
+            from_h = headers.get('from', '')
             # Extract caller number (naive): look for sip:user@ or "Name" <sip:user@ pattern
             caller_number = None
             try:
-                frag = from_h
-                if '<' in frag and '>' in frag:
-                    inside = frag.split('<',1)[1].split('>',1)[0]
+                lt = from_h.find('<')
+                if lt != -1 and '>' in from_h:
+                    gt = from_h.find('>', lt + 1)
+                    inside = from_h[lt+1:gt] if gt != -1 else from_h[lt+1:]
                 else:
-                    inside = frag
-                if 'sip:' in inside:
-                    user_part = inside.split('sip:',1)[1].split('@',1)[0]
+                    inside = from_h
+                sp = inside.find('sip:')
+                if sp != -1:
+                    at = inside.find('@', sp + 4)
+                    user_part = inside[sp+4:at] if at != -1 else inside[sp+4:]
                     # Strip non-dial chars except +
-                    num = re.sub(r'[^0-9+]', '', user_part)
+                    num = ''.join(c for c in user_part if c == '+' or '0' <= c <= '9')
                     if num:
                         caller_number = num
             except Exception:
@@ -909,21 +1395,19 @@ a=sendrecv
             chosen_codec = rtpmap.get(chosen_pt, 'PCMU') if chosen_pt in (0, 8) else 'PCMU'
 
             # Allocate internal call id and local RTP port
-            internal_id = self.call_id_counter
-            self.call_id_counter += 1
+            internal_id = self._next_call_id()
             local_rtp_port = 10000 + (internal_id % 1000) * 2
 
-            # Send 100 Trying and 180 Ringing fast
-            trying = self._create_sip_response_fast(message, "100 Trying")
-            sock.sendto(trying.encode('utf-8'), addr)
-            ringing = self._create_sip_response_fast(message, "180 Ringing")
-            sock.sendto(ringing.encode('utf-8'), addr)
+            # Send 100 Trying and 180 Ringing fast, in one batch where supported
+            trying = self._create_sip_response_fast(message, "100 Trying", headers)
+            ringing = self._create_sip_response_fast(message, "180 Ringing", headers)
+            self._sendmmsg(sock, [(trying.encode('utf-8'), addr), (ringing.encode('utf-8'), addr)])
 
             # NOTE: We do NOT immediately send 200 OK now. We defer answering until external condition
             # (WhatsApp 'ongoing voice call' notification) is met. Store offer details for later answer.
             # Store call and mapping; RTP will start after deferred 200 OK + ACK.
-            self._incoming_sip_to_internal[call_id_hdr] = internal_id
-            self.active_calls[internal_id] = {
+            call_info = {
+                'internal_id': internal_id,
                 'account_id': account_id,
                 'destination': from_h,
                 'caller_number': caller_number,
@@ -938,18 +1422,30 @@ a=sendrecv
                 'remote_codec': chosen_codec,
                 'auth_attempts': 0,
                 'incoming': True,
-                'raw_invite': message,
+                # Only the headers a response echoes are kept, not the whole INVITE
+                'resp_ctx': {k: headers.get(k, '') for k in ('via', 'from', 'to', 'call-id', 'cseq')},
                 'invite_received_ts': time.time(),
                 'deferred_answer': True,
                 'sip_addr': addr,
             }
+            self.active_calls[internal_id] = call_info
+            self._sip_call_to_info[call_id_hdr] = call_info
             if self.on_incoming_call:
                 # Notify application; it may trigger conditional answer later
-                self.on_incoming_call(account_id, internal_id, from_h)
+                self._sip_workers.submit(self._notify_incoming_call, account_id, internal_id, from_h)
 
         except Exception as e:
             print(f"❌ Incoming INVITE (media) error: {e}")
 
+    def _notify_incoming_call(self, account_id: int, internal_id: int, from_h: str):
+        """Deliver an incoming call to on_incoming_call (worker pool)"""
+        callback = self.on_incoming_call
+        if callback:
+            try:
+                callback(account_id, internal_id, from_h)
+            except Exception as e:
+                print(f"❌ Incoming call callback error (call {internal_id}): {e}")
+
     def answer_deferred_call(self, internal_id: int):
         """Send 200 OK + SDP for a previously deferred incoming call.
 
@@ -966,17 +1462,17 @@ a=sendrecv
             if call_info.get('state') != 'RINGING':
                 return False
 
-            raw_invite = call_info.get('raw_invite')
+            resp_ctx = call_info.get('resp_ctx')
             addr = call_info.get('sip_addr')
             account_id = call_info.get('account_id')
-            if not raw_invite or not addr or account_id is None:
+            if not resp_ctx or not addr or account_id is None:
                 return False
 
             # Build 200 OK with negotiated RTP port/codec
             local_rtp_port = call_info.get('rtp_port')
             pt = call_info.get('remote_pt', 0)
             codec = call_info.get('remote_codec', 'PCMU')
-            ok_response = self._create_200ok_with_sdp(raw_invite, local_rtp_port, pt, codec)
+            ok_response = self._create_200ok_with_sdp_ctx(resp_ctx, local_rtp_port, pt, codec)
             # Need the account's SIP socket to send
             # Retrieve underlying UDP socket from base manager (WorkingSipManager uses self.sockets)
             sock = None
@@ -1000,11 +1496,7 @@ a=sendrecv
             call_info['state'] = 'ANSWERED'
             # ACK will arrive later -> _handle_incoming_ack_with_media will start RTP
             print(f"✅ Deferred answer sent for call {internal_id} (acct {account_id})")
-            if self.on_call_state_changed:
-                try:
-                    self.on_call_state_changed(internal_id, 'ANSWERED', '200 OK sent (deferred)')
-                except Exception:
-                    pass
+            self._notify_state(internal_id, 'ANSWERED', '200 OK sent (deferred)')
             return True
         except Exception as e:
             print(f"❌ Error answering deferred call {internal_id}: {e}")
@@ -1012,60 +1504,74 @@ a=sendrecv
 
     def _handle_incoming_ack_with_media(self, account_id: int, message: str, addr: tuple, sock: socket.socket):
         try:
-            call_id_hdr = self._extract_header(message, 'Call-ID')
+            call_id_hdr = self._parse_headers(message).get('call-id')
             if not call_id_hdr:
                 return
-            internal_id = self._incoming_sip_to_internal.get(call_id_hdr)
-            if internal_id is None:
-                return
-            call_info = self.active_calls.get(internal_id)
+            call_info = self._sip_call_to_info.get(call_id_hdr)
             if not call_info:
                 return
 
-            # If we have remote IP/port and RTP is not already active, start RTP now
-            if call_info.get('remote_ip') and call_info.get('remote_rtp_port') and not call_info.get('rtp_active'):
-                time.sleep(0.1) 
-                started = self.rtp_manager.start_rtp_stream(
-                    internal_id,
-                    call_info['account_id'],
-                    call_info['rtp_port'],
-                    call_info['remote_ip'],
-                    call_info['remote_rtp_port'],
-                    call_info.get('remote_pt', 0),
-                    call_info.get('remote_codec', 'PCMU')
-                )
-                if started:
-                    call_info['rtp_active'] = True
-                    call_info['state'] = 'ESTABLISHED'
-                    # Ensure the main process audio session shows the SIP account name in Volume Mixer
-                    try:
-                        acct_id = call_info['account_id']
-                        username = self.accounts.get(acct_id, {}).get('username', f'Account{acct_id+1}')
-                        self.rtp_manager.set_main_process_mixer_name(f"SIP Account {acct_id + 1} ({username})")
-                    except Exception:
-                        pass
-                    print(f"📡 Incoming call {internal_id}: Media established")
-                    if self.on_call_state_changed:
-                        self.on_call_state_changed(internal_id, 'ESTABLISHED', 'Call established')
+            # If we have remote IP/port and RTP is not already active, start RTP now.
+            # Opening audio devices can be slow, so it runs on a worker; the flag absorbs ACK retransmits
+            if (call_info.get('remote_ip') and call_info.get('remote_rtp_port')
+                    and not call_info.get('rtp_active') and not call_info.get('rtp_starting')):
+                call_info['rtp_starting'] = True
+                self._sip_workers.submit(self._start_incoming_media, call_id_hdr, call_info)
+
+        except Exception as e:
+            print(f"❌ Incoming ACK handling error: {e}")
+
+    def _start_incoming_media(self, call_id_hdr: str, call_info: dict):
+        """Start RTP for an acknowledged incoming call (worker pool)"""
+        internal_id = call_info['internal_id']
+        try:
+            started = self.rtp_manager.start_rtp_stream(
+                internal_id,
+                call_info['account_id'],
+                call_info['rtp_port'],
+                call_info['remote_ip'],
+                call_info['remote_rtp_port'],
+                call_info.get('remote_pt', 0),
+                call_info.get('remote_codec', 'PCMU')
+            )
+            if not started:
+                return
+            if self._sip_call_to_info.get(call_id_hdr) is not call_info:
+                # A BYE ended the call while the devices were opening
+                self.rtp_manager.stop_rtp_stream(internal_id)
+                return
+            call_info['rtp_active'] = True
+            call_info['state'] = 'ESTABLISHED'
+            # Ensure the main process audio session shows the SIP account name in Volume Mixer
+            try:
+                acct_id = call_info['account_id']
+                username = self.accounts.get(acct_id, {}).get('username', f'Account{acct_id+1}')
+                self.rtp_manager.set_main_process_mixer_name(f"SIP Account {acct_id + 1} ({username})")
+            except Exception:
+                pass
+            print(f"📡 Incoming call {internal_id}: Media established")
+            self._notify_state(internal_id, 'ESTABLISHED', 'Call established')
 
         except Exception as e:
             print(f"❌ Incoming ACK handling error: {e}")
+        finally:
+            call_info['rtp_starting'] = False
 
     def _handle_incoming_bye_with_media(self, account_id: int, message: str, addr: tuple, sock: socket.socket):
         try:
-            call_id_hdr = self._extract_header(message, 'Call-ID')
-            internal_id = self._incoming_sip_to_internal.get(call_id_hdr)
+            headers = self._parse_headers(message)
+            call_info = self._sip_call_to_info.pop(headers.get('call-id'), None)
             # Send 200 OK
-            response = self._create_sip_response(message, "200 OK")
+            response = self._create_sip_response(message, "200 OK", headers)
             sock.sendto(response.encode('utf-8'), addr)
 
-            if internal_id is not None:
+            if call_info is not None:
                 # Stop RTP and cleanup
+                internal_id = call_info['internal_id']
                 self.rtp_manager.stop_rtp_stream(internal_id)
                 self.active_calls.pop(internal_id, None)
                 print(f"📞 Incoming call {internal_id} ended")
-                if self.on_call_state_changed:
-                    self.on_call_state_changed(internal_id, 'TERMINATED', 'Call terminated')
+                self._notify_state(internal_id, 'TERMINATED', 'Call terminated')
 
         except Exception as e:
             print(f"❌ Incoming BYE handling error: {e}")
@@ -1087,8 +1593,7 @@ a=sendrecv
             return None
             
         # Generate call ID
-        call_id = self.call_id_counter
-        self.call_id_counter += 1
+        call_id = self._next_call_id()
         
         # Start call in thread
         call_thread = threading.Thread(
@@ -1103,11 +1608,13 @@ a=sendrecv
     def _make_call_thread(self, call_id: int, account_id: int, destination: str, 
                          account: dict, sock: socket.socket):
         """Thread for making a SIP call"""
+        sip_call_id = None
         try:
             # Generate SIP call identifiers
-            sip_call_id = f"{random.randint(1000000, 9999999)}@{self.local_ip}"
-            from_tag = str(random.randint(1000000, 9999999))
-            branch = f"z9hG4bK{random.randint(100000, 999999)}"
+            token = os.urandom(16)
+            sip_call_id = f"{token[:8].hex()}@{self.local_ip}"
+            from_tag = token[8:12].hex()
+            branch = f"z9hG4bK{token[12:].hex()}"
             local_port = sock.getsockname()[1]
             
             # Choose RTP port (even number, next odd for RTCP)
@@ -1119,8 +1626,10 @@ a=sendrecv
                 local_port, rtp_port
             )
             
+            # Register for responses before sending, so the shared listener can hand them over
+            self._response_waiters.setdefault(sip_call_id, queue.Queue())
             print(f"Sending INVITE to {destination}...")
-            sock.sendto(invite_msg.encode('utf-8'), (account['domain'], account['port']))
+            sock.sendto(invite_msg.encode('utf-8'), account['sockaddr'])
             
             # Store call info
             self.active_calls[call_id] = {
@@ -1142,43 +1651,34 @@ a=sendrecv
             
         except Exception as e:
             print(f"Error making call {call_id}: {e}")
+            self._response_waiters.pop(sip_call_id, None)
             if call_id in self.active_calls:
                 del self.active_calls[call_id]
                 
     def _create_invite_message(self, account: dict, destination: str, sip_call_id: str, from_tag: str, branch: str, local_port: int, rtp_port: int) -> str:
             """Create SIP INVITE message with SDP"""
-            username = account['username']
-            domain = account['domain']
-
-            # SDP (Session Description Protocol) for audio — offer PCMU(0) and PCMA(8)
-            sdp = f"""v=0
-o={username} {random.randint(1000000, 9999999)} {random.randint(1000000, 9999999)} IN IP4 {self.local_ip}
-s=SIP Call
-c=IN IP4 {self.local_ip}
-t=0 0
-m=audio {rtp_port} RTP/AVP 0 8
-a=rtpmap:0 PCMU/8000
-a=rtpmap:8 PCMA/8000
-a=sendrecv
-"""
-
-            content_length = len(sdp)
-
-            message = f"""INVITE sip:{destination}@{domain} SIP/2.0
-Via: SIP/2.0/UDP {self.local_ip}:{local_port};branch={branch}
-Max-Forwards: 70
-From: <sip:{username}@{domain}>;tag={from_tag}
-To: <sip:{destination}@{domain}>
-Call-ID: {sip_call_id}
-CSeq: 1 INVITE
-Contact: <sip:{username}@{self.local_ip}:{local_port}>
-Content-Type: application/sdp
-Content-Length: {content_length}
-User-Agent: EnhancedSipDialer/1.0
-
-{sdp}"""
+            return self._build_invite(account, destination, sip_call_id, from_tag, branch, local_port, rtp_port, 1)
 
-            return message
+    def _build_invite(self, account: dict, destination: str, sip_call_id: str, from_tag: str, branch: str,
+                      local_port: int, rtp_port: int, cseq: int, auth_header: Optional[str] = None) -> str:
+        """Format an INVITE and its SDP offer (PCMU(0) and PCMA(8)) from the module templates"""
+        username = account['username']
+        domain = account['domain']
+        local_ip = self.local_ip
+        sdp = _SDP_OFFER_TMPL % (username, _session_id(), _session_id(), local_ip, local_ip, rtp_port)
+        extra = f"Authorization: {auth_header}\r\n" if auth_header else ""
+        return _INVITE_TMPL % (
+            destination, domain,
+            local_ip, local_port, branch,
+            username, domain, from_tag,
+            destination, domain,
+            sip_call_id,
+            cseq,
+            username, local_ip, local_port,
+            extra,
+            len(sdp),
+            sdp,
+        )
         
     def _create_auth_invite_response(self, challenge_response: str, account: dict, call_info: dict) -> str:
         """Create authenticated INVITE message in response to 401"""
@@ -1186,7 +1686,7 @@ User-Agent: EnhancedSipDialer/1.0
             # Parse challenge
             challenge_line = None
             for line in challenge_response.split('\n'):
-                if 'WWW-Authenticate:' in line or 'Proxy-Authenticate:' in line:
+                if line.startswith(('WWW-Authenticate:', 'Proxy-Authenticate:')):
                     challenge_line = line
                     break
                     
@@ -1194,19 +1694,18 @@ User-Agent: EnhancedSipDialer/1.0
                 return None
                 
             # Extract nonce and realm
-            import re
-            nonce_match = re.search(r'nonce="([^"]*)"', challenge_line)
-            realm_match = re.search(r'realm="([^"]*)"', challenge_line)
+            nonce = self._quoted_param(challenge_line, 'nonce')
+            realm = self._quoted_param(challenge_line, 'realm')
             
-            if not nonce_match:
+            if nonce is None:
                 return None
                 
-            nonce = nonce_match.group(1)
-            realm = realm_match.group(1) if realm_match else account['domain']
+            if realm is None:
+                realm = account['domain']
             
             # Generate new identifiers for authenticated INVITE
-            from_tag = str(random.randint(1000000, 9999999))
-            branch = f"z9hG4bK{random.randint(100000, 999999)}"
+            from_tag = _tag()
+            branch = _branch()
             
             # Create auth header
             auth_header = self._create_auth_header(
@@ -1219,55 +1718,48 @@ User-Agent: EnhancedSipDialer/1.0
                 return None
                 
             # Create authenticated INVITE message
-            username = account['username']
-            domain = account['domain']
-            destination = call_info['destination']
-            sip_call_id = call_info['sip_call_id']
             local_port = call_info['rtp_port'] - 1000  # Estimate local port
-            rtp_port = call_info['rtp_port']
-            
-            # SDP (Session Description Protocol) for audio - offer PCMU and PCMA
-            sdp = f"""v=0
-o={username} {random.randint(1000000, 9999999)} {random.randint(1000000, 9999999)} IN IP4 {self.local_ip}
-s=SIP Call
-c=IN IP4 {self.local_ip}
-t=0 0
-m=audio {rtp_port} RTP/AVP 0 8
-a=rtpmap:0 PCMU/8000
-a=rtpmap:8 PCMA/8000
-a=sendrecv
-"""
-            
-            content_length = len(sdp)
-            
-            message = f"""INVITE sip:{destination}@{domain} SIP/2.0
-Via: SIP/2.0/UDP {self.local_ip}:{local_port};branch={branch}
-Max-Forwards: 70
-From: <sip:{username}@{domain}>;tag={from_tag}
-To: <sip:{destination}@{domain}>
-Call-ID: {sip_call_id}
-CSeq: {call_info['auth_attempts'] + 1} INVITE
-Contact: <sip:{username}@{self.local_ip}:{local_port}>
-Authorization: {auth_header}
-Content-Type: application/sdp
-Content-Length: {content_length}
-User-Agent: EnhancedSipDialer/1.0
-
-{sdp}"""
-            
-            return message
+            return self._build_invite(
+                account, call_info['destination'], call_info['sip_call_id'], from_tag, branch,
+                local_port, call_info['rtp_port'], call_info['auth_attempts'] + 1, auth_header
+            )
             
         except Exception as e:
             print(f"Error creating auth INVITE: {e}")
             return None
             
+    @staticmethod
+    def _quoted_param(text: str, name: str) -> Optional[str]:
+        """Return the value of name="..." in an auth header, or None"""
+        start = text.find(name + '="')
+        if start == -1:
+            return None
+        start += len(name) + 2
+        end = text.find('"', start)
+        return text[start:end] if end != -1 else None
+        
+    @staticmethod
+    def _remember(cache: dict, key, value, limit: int = 256):
+        """Store into a bounded memo dict, evicting the oldest entry when full"""
+        if len(cache) >= limit:
+            cache.pop(next(iter(cache)))
+        cache[key] = value
+        
     def _create_auth_header(self, username: str, password: str, method: str, uri: str, realm: str, nonce: str) -> str:
         """Create digest authentication header"""
         try:
-            # MD5 calculation for digest authentication
-            ha1 = hashlib.md5(f"{username}:{realm}:{password}".encode()).hexdigest()
-            ha2 = hashlib.md5(f"{method}:{uri}".encode()).hexdigest()
-            response_hash = hashlib.md5(f"{ha1}:{nonce}:{ha2}".encode()).hexdigest()
+            # MD5 calculation for digest authentication (memoized; retries reuse HA1)
+            ha1_key = (username, realm, password)
+            ha1 = self._ha1_cache.get(ha1_key)
+            if ha1 is None:
+                ha1 = hashlib.md5(f"{username}:{realm}:{password}".encode()).hexdigest()
+                self._remember(self._ha1_cache, ha1_key, ha1)
+            digest_key = (ha1, method, uri, nonce)
+            response_hash = self._digest_cache.get(digest_key)
+            if response_hash is None:
+                ha2 = hashlib.md5(f"{method}:{uri}".encode()).hexdigest()
+                response_hash = hashlib.md5(f"{ha1}:{nonce}:{ha2}".encode()).hexdigest()
+                self._remember(self._digest_cache, digest_key, response_hash)
             
             # Build Authorization header
             auth_header = f'Digest username="{username}", realm="{realm}", nonce="{nonce}", uri="{uri}", response="{response_hash}"'
@@ -1284,204 +1776,251 @@ User-Agent: EnhancedSipDialer/1.0
             return
             
         call_info = self.active_calls[call_id]
-        sock.settimeout(30.0)  # 30 second timeout
+        sip_call_id = call_info['sip_call_id']
+        waiter = self._response_waiters.setdefault(sip_call_id, queue.Queue())
+        response_timeout = 30.0  # 30 second timeout
         
+        # Receive buffers are shared across calls; recvmmsg drains queued responses in one call
         try:
-            while call_info['state'] in ['CALLING', 'RINGING']:
-                response_data, addr = sock.recvfrom(4096)
-                response = response_data.decode('utf-8')
-                
-                first_line = response.split('\n')[0] if '\n' in response else response
-                print(f"Call {call_id} response: {first_line}")
-                
-                if "SIP/2.0 100 Trying" in first_line:
-                    call_info['state'] = 'TRYING'
-                    print(f"Call {call_id}: Trying")
-                    
-                elif "SIP/2.0 180 Ringing" in first_line or "SIP/2.0 183 Session Progress" in first_line:
-                    call_info['state'] = 'RINGING'
-                    print(f"Call {call_id}: Ringing")
-                    if self.on_call_state_changed:
-                        self.on_call_state_changed(call_id, 'RINGING', 'Ringing')
-                        
-                elif "SIP/2.0 200 OK" in first_line:
-                    call_info['state'] = 'ANSWERED'
-                    print(f"Call {call_id}: Answered")
-                    
-                    # Fallback remote IP to responder address; SDP may override
-                    call_info['remote_ip'] = addr[0]
-
-                    # Parse SDP from response to get remote RTP info
-                    self._parse_sdp_response(call_id, response)
-                    
-                    # Send ACK
-                    ack_msg = self._create_ack_message(call_info)
-                    sock.sendto(ack_msg.encode('utf-8'), addr)
-                    
-                    # Start RTP media with negotiated payload type/codec, only if not already active
-                    if call_info['remote_rtp_port'] and call_info['remote_ip'] and not call_info.get('rtp_active'):
-                        started = self.rtp_manager.start_rtp_stream(
-                            call_id,
-                            call_info['account_id'],
-                            call_info['rtp_port'],
-                            call_info['remote_ip'],
-                            call_info['remote_rtp_port'],
-                            call_info.get('remote_pt', 0),
-                            call_info.get('remote_codec', 'PCMU')
-                        )
-                        call_info['rtp_active'] = bool(started)
-                        if started:
-                            # Ensure the main process audio session shows the SIP account name in Volume Mixer
-                            try:
-                                acct_id = call_info['account_id']
-                                username = self.accounts.get(acct_id, {}).get('username', f'Account{acct_id+1}')
-                                self.rtp_manager.set_main_process_mixer_name(f"SIP Account {acct_id + 1} ({username})")
-                            except Exception:
-                                pass
-                        
-                    call_info['state'] = 'ESTABLISHED'
-                    print(f"Call {call_id}: Media established")
-                    if self.on_call_state_changed:
-                        self.on_call_state_changed(call_id, 'ESTABLISHED', 'Call established')
-                        time.sleep(0.1)
-                    break
-                    
-                elif "SIP/2.0 401 Unauthorized" in first_line:
-                    # Handle authentication challenge for INVITE
-                    call_info['auth_attempts'] += 1
-                    
-                    if call_info['auth_attempts'] > 2:
-                        call_info['state'] = 'FAILED'
-                        print(f"Call {call_id}: Too many auth attempts ({call_info['auth_attempts']})")
-                        if self.on_call_state_changed:
-                            self.on_call_state_changed(call_id, 'FAILED', 'Authentication failed - too many attempts')
-                        break
-                    
-                    print(f"Call {call_id}: Authentication required for INVITE (attempt {call_info['auth_attempts']})")
-                    
-                    account = self.accounts[call_info['account_id']]
-                    auth_response = self._create_auth_invite_response(response, account, call_info)
-                    
-                    if auth_response:
-                        print(f"Call {call_id}: Sending authenticated INVITE...")
-                        sock.sendto(auth_response.encode('utf-8'), (account['domain'], account['port']))
-                        # Continue waiting for response
-                    else:
-                        call_info['state'] = 'FAILED'
-                        print(f"Call {call_id}: Failed to create auth INVITE")
-                        if self.on_call_state_changed:
-                            self.on_call_state_changed(call_id, 'FAILED', 'Authentication failed')
-                        break
-                    
-                elif "SIP/2.0 486 Busy Here" in first_line or "SIP/2.0 603 Decline" in first_line:
-                    call_info['state'] = 'BUSY'
-                    print(f"Call {call_id}: Busy/Declined")
-                    if self.on_call_state_changed:
-                        self.on_call_state_changed(call_id, 'BUSY', 'Busy')
-                    break
-                    
-                elif "SIP/2.0 408 Request Timeout" in first_line:
-                    call_info['state'] = 'TIMEOUT'
-                    print(f"Call {call_id}: 408 Request Timeout - server didn't respond in time")
-                    if self.on_call_state_changed:
-                        self.on_call_state_changed(call_id, 'TIMEOUT', '408 Request Timeout')
-                    break
-                    
-                elif "SIP/2.0 404 Not Found" in first_line:
-                    call_info['state'] = 'FAILED'
-                    print(f"Call {call_id}: 404 Not Found - destination doesn't exist")
-                    if self.on_call_state_changed:
-                        self.on_call_state_changed(call_id, 'FAILED', '404 Not Found')
-                    break
-                    
-                elif first_line.startswith("SIP/2.0 4") or first_line.startswith("SIP/2.0 5") or first_line.startswith("SIP/2.0 6"):
-                    call_info['state'] = 'FAILED'
-                    print(f"Call {call_id}: Failed - {first_line}")
-                    if self.on_call_state_changed:
-                        self.on_call_state_changed(call_id, 'FAILED', f'Failed: {first_line}')
-                    break
+            batch, rx_buf = self._rx_bufs.pop()
+        except IndexError:
+            batch = _RecvMmsgBatch(count=8) if _libc is not None else None
+            rx_buf = bytearray(4096)
+        use_batch = batch is not None and sock.family == socket.AF_INET
+        rx_view = memoryview(rx_buf)
+        
+        try:
+            deadline = time.monotonic() + response_timeout
+            done = call_info['state'] not in ('CALLING', 'RINGING')
+            while not done:
+                # Responses the shared listener read from this socket first
+                packets = []
+                try:
+                    while True:
+                        packets.append(waiter.get_nowait())
+                except queue.Empty:
+                    pass
+                if not packets:
+                    # Wait in short slices so handed-over responses are picked up promptly
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise socket.timeout("timed out")
+                    try:
+                        if use_batch:
+                            packets = batch.recv(sock, min(remaining, 0.2))
+                        else:
+                            sock.settimeout(min(remaining, 0.2))
+                            nbytes, addr = sock.recvfrom_into(rx_buf, 4096)
+                            packets = [(rx_view[:nbytes], addr)]
+                    except socket.timeout:
+                        continue
+                # As with a blocking receive, the timeout restarts after each datagram
+                deadline = time.monotonic() + response_timeout
+                for data, addr in packets:
+                    if done:
+                        # Datagrams queued behind the final response belong to the listener
+                        self._dispatch_incoming(call_info['account_id'], data, addr, sock)
+                        continue
+                    done = (self._handle_call_response(call_id, call_info, str(data, 'utf-8'), addr, sock)
+                            or call_info['state'] not in ('CALLING', 'RINGING'))
                     
         except socket.timeout:
             call_info['state'] = 'TIMEOUT'
-            print(f"Call {call_id}: Timeout")
-            if self.on_call_state_changed:
-                self.on_call_state_changed(call_id, 'TIMEOUT', 'Call timeout')
+            _log.warning("Call %s: Timeout", call_id)
+            self._notify_state(call_id, 'TIMEOUT', 'Call timeout')
                 
         except Exception as e:
             call_info['state'] = 'ERROR'
-            print(f"Call {call_id}: Error - {e}")
-            if self.on_call_state_changed:
-                self.on_call_state_changed(call_id, 'ERROR', f'Error: {e}')
+            _log.error("Call %s: Error - %s", call_id, e)
+            self._notify_state(call_id, 'ERROR', f'Error: {e}')
+            
+        finally:
+            self._response_waiters.pop(sip_call_id, None)
+            self._rx_bufs.append((batch, rx_buf))
                 
+    def _handle_call_response(self, call_id: int, call_info: dict, response: str, addr: tuple,
+                              sock: socket.socket) -> bool:
+        """Act on one response to our INVITE; returns True once call setup has finished"""
+        # Slice the status line only; splitting would copy every line of the response
+        nl = response.find('\n')
+        first_line = response if nl == -1 else response[:nl]
+        _log.debug("Call %s response: %s", call_id, first_line)
+
+        # Route on the numeric status code: one dict probe instead of a chain of prefix compares
+        parts = first_line.split(None, 2)
+        if len(parts) < 2 or parts[0] != 'SIP/2.0' or not parts[1].isdigit():
+            return False
+        code = int(parts[1])
+        handler = self._invite_status_handlers.get(code)
+        if handler is None:
+            if code // 100 not in (4, 5, 6):
+                return False
+            handler = self._on_invite_failed
+        return handler(call_id, call_info, first_line, response, addr, sock)
+
+    def _on_invite_trying(self, call_id: int, call_info: dict, first_line: str, response: str,
+                          addr: tuple, sock: socket.socket) -> bool:
+        call_info['state'] = 'TRYING'
+        _log.debug("Call %s: Trying", call_id)
+        return False
+
+    def _on_invite_ringing(self, call_id: int, call_info: dict, first_line: str, response: str,
+                           addr: tuple, sock: socket.socket) -> bool:
+        call_info['state'] = 'RINGING'
+        _log.debug("Call %s: Ringing", call_id)
+        self._notify_state(call_id, 'RINGING', 'Ringing')
+        return False
+
+    def _on_invite_ok(self, call_id: int, call_info: dict, first_line: str, response: str,
+                      addr: tuple, sock: socket.socket) -> bool:
+        call_info['state'] = 'ANSWERED'
+        _log.debug("Call %s: Answered", call_id)
+
+        # Fallback remote IP to responder address; SDP may override
+        call_info['remote_ip'] = addr[0]
+
+        # Parse SDP from response to get remote RTP info
+        self._parse_sdp_response(call_id, response)
+
+        # Send ACK
+        ack_msg = self._create_ack_message(call_info)
+        sock.sendto(ack_msg.encode('utf-8'), addr)
+
+        # Start RTP media with negotiated payload type/codec, only if not already active
+        if call_info['remote_rtp_port'] and call_info['remote_ip'] and not call_info.get('rtp_active'):
+            started = self.rtp_manager.start_rtp_stream(
+                call_id,
+                call_info['account_id'],
+                call_info['rtp_port'],
+                call_info['remote_ip'],
+                call_info['remote_rtp_port'],
+                call_info.get('remote_pt', 0),
+                call_info.get('remote_codec', 'PCMU')
+            )
+            call_info['rtp_active'] = bool(started)
+            if started:
+                # Ensure the main process audio session shows the SIP account name in Volume Mixer
+                try:
+                    acct_id = call_info['account_id']
+                    username = self.accounts.get(acct_id, {}).get('username', f'Account{acct_id+1}')
+                    self.rtp_manager.set_main_process_mixer_name(f"SIP Account {acct_id + 1} ({username})")
+                except Exception:
+                    pass
+
+        call_info['state'] = 'ESTABLISHED'
+        _log.debug("Call %s: Media established", call_id)
+        self._notify_state(call_id, 'ESTABLISHED', 'Call established')
+        return True
+
+    def _on_invite_challenge(self, call_id: int, call_info: dict, first_line: str, response: str,
+                             addr: tuple, sock: socket.socket) -> bool:
+        # Handle authentication challenge for INVITE
+        call_info['auth_attempts'] += 1
+
+        if call_info['auth_attempts'] > 2:
+            call_info['state'] = 'FAILED'
+            _log.warning("Call %s: Too many auth attempts (%s)", call_id, call_info['auth_attempts'])
+            self._notify_state(call_id, 'FAILED', 'Authentication failed - too many attempts')
+            return True
+
+        _log.debug("Call %s: Authentication required for INVITE (attempt %s)", call_id, call_info['auth_attempts'])
+
+        account = self.accounts[call_info['account_id']]
+        auth_response = self._create_auth_invite_response(response, account, call_info)
+
+        if auth_response:
+            _log.debug("Call %s: Sending authenticated INVITE...", call_id)
+            sock.sendto(auth_response.encode('utf-8'), account['sockaddr'])
+            # Continue waiting for response
+        else:
+            call_info['state'] = 'FAILED'
+            _log.warning("Call %s: Failed to create auth INVITE", call_id)
+            self._notify_state(call_id, 'FAILED', 'Authentication failed')
+            return True
+        return False
+
+    def _on_invite_busy(self, call_id: int, call_info: dict, first_line: str, response: str,
+                        addr: tuple, sock: socket.socket) -> bool:
+        call_info['state'] = 'BUSY'
+        _log.info("Call %s: Busy/Declined", call_id)
+        self._notify_state(call_id, 'BUSY', 'Busy')
+        return True
+
+    def _on_invite_timeout(self, call_id: int, call_info: dict, first_line: str, response: str,
+                           addr: tuple, sock: socket.socket) -> bool:
+        call_info['state'] = 'TIMEOUT'
+        _log.warning("Call %s: 408 Request Timeout - server didn't respond in time", call_id)
+        self._notify_state(call_id, 'TIMEOUT', '408 Request Timeout')
+        return True
+
+    def _on_invite_not_found(self, call_id: int, call_info: dict, first_line: str, response: str,
+                             addr: tuple, sock: socket.socket) -> bool:
+        call_info['state'] = 'FAILED'
+        _log.warning("Call %s: 404 Not Found - destination doesn't exist", call_id)
+        self._notify_state(call_id, 'FAILED', '404 Not Found')
+        return True
+
+    def _on_invite_failed(self, call_id: int, call_info: dict, first_line: str, response: str,
+                          addr: tuple, sock: socket.socket) -> bool:
+        """Any other 4xx/5xx/6xx final response"""
+        call_info['state'] = 'FAILED'
+        _log.warning("Call %s: Failed - %s", call_id, first_line)
+        self._notify_state(call_id, 'FAILED', f'Failed: {first_line}')
+        return True
+
     def _parse_sdp_response(self, call_id: int, response: str):
         """Parse SDP from 200 OK response to get remote media info and negotiated codec"""
         if call_id not in self.active_calls:
             return
             
         call_info = self.active_calls[call_id]
-        # Parse To-tag and CSeq for ACK correctness
-        try:
-            for line in response.split('\n')[:40]:
-                line = line.strip()
-                if line.startswith('To:') and 'tag=' in line:
-                    # extract tag= value
-                    m = re.search(r'tag=([^;>\s]+)', line)
-                    if m:
-                        call_info['to_tag'] = m.group(1)
-                elif line.startswith('CSeq:'):
-                    # format: CSeq: <num> INVITE
-                    parts = line.split()
-                    if len(parts) >= 2 and parts[1].isdigit():
-                        call_info['invite_cseq'] = int(parts[1])
-        except Exception:
-            pass
+        sdp_start = response.find('\r\n\r\n')
+        header_end = sdp_start if sdp_start != -1 else response.find('\n\n')
+        if header_end == -1:
+            header_end = len(response)
+
+        # Parse To-tag and CSeq for ACK correctness, searching the header block in place
+        m = _TO_TAG_RE.search(response, 0, header_end)
+        if m:
+            call_info['to_tag'] = m.group(1)
+        # format: CSeq: <num> INVITE
+        m = _CSEQ_NUM_RE.search(response, 0, header_end)
+        if m:
+            call_info['invite_cseq'] = int(m.group(1))
         
         # Extract SDP section
-        sdp_start = response.find('\r\n\r\n')
         if sdp_start == -1:
             return
             
-        sdp = response[sdp_start + 4:]
+        sdp_start += 4
         
-        # Parse SDP lines
-        pts = []
-        rtpmap = {}
-        for line in sdp.split('\n'):
-            line = line.strip()
-            if line.startswith('c=IN IP4 '):
-                # Connection info; prefer public IP, otherwise keep existing (likely addr[0])
-                ip = line.split()[-1]
-                if self._is_public_ip(ip):
-                    call_info['remote_ip'] = ip
-            elif line.startswith('m=audio '):
-                # Media line: m=audio port RTP/AVP ...
-                parts = line.split()
-                if len(parts) >= 2:
-                    call_info['remote_rtp_port'] = int(parts[1])
-                    if len(parts) > 3:
-                        for tok in parts[3:]:
-                            if tok.isdigit():
-                                pts.append(int(tok))
-            elif line.startswith('a=rtpmap:'):
-                try:
-                    after = line.split(':', 1)[1]
-                    pt_str, rest = after.split(None, 1)
-                    pt = int(pt_str)
-                    codec = rest.split('/')[0].upper()
-                    rtpmap[pt] = codec
-                except Exception:
-                    pass
+        # Connection info; prefer public IP, otherwise keep existing (likely addr[0])
+        for m in _SDP_CONN_RE.finditer(response, sdp_start):
+            ip = m.group(1)
+            if self._is_public_ip(ip):
+                call_info['remote_ip'] = ip
+        # Media line: m=audio port RTP/AVP <pt> ...; rank offered PTs in the same pass
+        codec_pref = self._codec_pref
+        best_pt = None
+        best_rank = len(codec_pref)
+        for m in _SDP_MAUDIO_RE.finditer(response, sdp_start):
+            call_info['remote_rtp_port'] = int(m.group(1))
+            for tok in m.group(2).split():
+                if tok.isdigit():
+                    pref = codec_pref.get(int(tok))
+                    if pref is not None and pref[0] < best_rank:
+                        best_rank = pref[0]
+                        best_pt = int(tok)
+        rtpmap = {int(m.group(1)): m.group(2).upper() for m in _SDP_RTPMAP_RE.finditer(response, sdp_start)}
 
-        # Choose codec for outgoing media: prefer PCMU else PCMA if offered
-        if pts:
-            if 0 in pts:
-                call_info['remote_pt'] = 0
-                call_info['remote_codec'] = rtpmap.get(0, 'PCMU')
-            elif 8 in pts:
-                call_info['remote_pt'] = 8
-                call_info['remote_codec'] = rtpmap.get(8, 'PCMA')
+        # Choose codec for outgoing media: best-ranked offered PT, named by rtpmap when present
+        if best_pt is not None:
+            call_info['remote_pt'] = best_pt
+            call_info['remote_codec'] = rtpmap.get(best_pt, codec_pref[best_pt][1])
 
-        print(f"Call {call_id}: Remote RTP {call_info.get('remote_ip')}:{call_info.get('remote_rtp_port')} PT={call_info.get('remote_pt','?')} Codec={call_info.get('remote_codec','?')}")
+        _log.debug("Call %s: Remote RTP %s:%s PT=%s Codec=%s", call_id,
+                   call_info.get('remote_ip'), call_info.get('remote_rtp_port'),
+                   call_info.get('remote_pt', '?'), call_info.get('remote_codec', '?'))
         
     def _create_ack_message(self, call_info: dict) -> str:
         """Create ACK message for established call"""
@@ -1489,47 +2028,58 @@ User-Agent: EnhancedSipDialer/1.0
         username = account['username']
         domain = account['domain']
         cseq_num = call_info.get('invite_cseq', 1)
-
-        message = f"""ACK sip:{call_info['destination']}@{domain} SIP/2.0
-Via: SIP/2.0/UDP {self.local_ip}:5060;branch=z9hG4bK{random.randint(100000, 999999)}
-Max-Forwards: 70
-From: <sip:{username}@{domain}>;tag={call_info['from_tag']}
-To: <sip:{call_info['destination']}@{domain}>;tag={call_info['to_tag']}
-Call-ID: {call_info['sip_call_id']}
-CSeq: {cseq_num} ACK
-Content-Length: 0
-
-"""
-        return message
+        destination = call_info['destination']
+        return _IN_DIALOG_TMPL % (
+            'ACK', destination, domain,
+            self.local_ip, _branch(),
+            username, domain, call_info['from_tag'],
+            destination, domain, call_info['to_tag'],
+            call_info['sip_call_id'],
+            cseq_num, 'ACK',
+        )
         
     def hangup_call(self, call_id: int) -> bool:
         """Hangup an active call"""
-        if call_id not in self.active_calls:
-            print(f"Call {call_id} not found")
-            return False
-            
-        call_info = self.active_calls[call_id]
-        
-        # Stop RTP stream
-        self.rtp_manager.stop_rtp_stream(call_id)
-        
-        # Send BYE message if call was established
-        if call_info['state'] == 'ESTABLISHED':
-            account_id = call_info['account_id']
-            sock = self.sockets.get(account_id)
-            if sock:
-                bye_msg = self._create_bye_message(call_info)
-                account = self.accounts[account_id]
-                sock.sendto(bye_msg.encode('utf-8'), (account['domain'], account['port']))
-                
-        # Remove call
-        del self.active_calls[call_id]
-        print(f"Call {call_id} hung up")
-        
-        if self.on_call_state_changed:
-            self.on_call_state_changed(call_id, 'TERMINATED', 'Call terminated')
-            
-        return True
+        return self.hangup_calls([call_id]) == 1
+
+    def hangup_calls(self, call_ids: List[int]) -> int:
+        """Hang up several calls, sending each account's BYEs in one batch. Returns calls ended."""
+        active_calls = self.active_calls
+        sockets = self.sockets
+        accounts = self.accounts
+        stop_rtp = self.rtp_manager.stop_rtp_stream
+        outbox = {}  # account_id -> (sock, [(data, addr)])
+        ended = []
+        for call_id in call_ids:
+            # Remove call
+            call_info = active_calls.pop(call_id, None)
+            if call_info is None:
+                _log.warning("Call %s not found", call_id)
+                continue
+            self._sip_call_to_info.pop(call_info.get('sip_call_id'), None)
+
+            # Stop RTP stream
+            stop_rtp(call_id)
+
+            # Queue BYE message if call was established
+            if call_info['state'] == 'ESTABLISHED':
+                account_id = call_info['account_id']
+                sock = sockets.get(account_id)
+                if sock:
+                    account = accounts[account_id]
+                    bye_msg = self._create_bye_message(call_info, account)
+                    outbox.setdefault(account_id, (sock, []))[1].append(
+                        (bye_msg.encode('utf-8'), account['sockaddr']))
+            ended.append(call_id)
+
+        for sock, datagrams in outbox.values():
+            self._sendmmsg(sock, datagrams)
+
+        for call_id in ended:
+            _log.debug("Call %s hung up", call_id)
+            self._notify_state(call_id, 'TERMINATED', 'Call terminated')
+
+        return len(ended)
 
     # -------- Deferred Answer Support --------
     def answer_incoming_call(self, internal_id: int) -> bool:
@@ -1540,8 +2090,9 @@ Content-Length: 0
         if not call_info:
             print(f"Deferred answer: call {internal_id} not found")
             return False
-        if call_info.get('state') not in ('RINGING', 'ANSWERING'):
-            print(f"Deferred answer: call {internal_id} state {call_info.get('state')} not ringable")
+        state = call_info.get('state')
+        if state not in ('RINGING', 'ANSWERING'):
+            print(f"Deferred answer: call {internal_id} state {state} not ringable")
             return False
         account_id = call_info['account_id']
         sock = self.sockets.get(account_id)
@@ -1549,12 +2100,12 @@ Content-Length: 0
             print(f"Deferred answer: no socket for account {account_id}")
             return False
         try:
-            msg = call_info.get('raw_invite')
-            if not msg:
-                print(f"Deferred answer: missing raw INVITE for call {internal_id}")
+            resp_ctx = call_info.get('resp_ctx')
+            if not resp_ctx:
+                print(f"Deferred answer: missing INVITE context for call {internal_id}")
                 return False
-            ok_msg = self._create_200ok_with_sdp(
-                msg,
+            ok_msg = self._create_200ok_with_sdp_ctx(
+                resp_ctx,
                 call_info['rtp_port'],
                 call_info.get('remote_pt', 0),
                 call_info.get('remote_codec', 'PCMU')
@@ -1567,30 +2118,27 @@ Content-Length: 0
             call_info['state'] = 'ANSWERED'
             call_info['answered_ts'] = time.time()
             print(f"\u2705 Deferred 200 OK sent for call {internal_id}; waiting for ACK")
-            if self.on_call_state_changed:
-                self.on_call_state_changed(internal_id, 'ANSWERED', 'Answered (deferred)')
+            self._notify_state(internal_id, 'ANSWERED', 'Answered (deferred)')
             return True
         except Exception as e:
             print(f"Deferred answer error call {internal_id}: {e}")
             return False
         
-    def _create_bye_message(self, call_info: dict) -> str:
+    def _create_bye_message(self, call_info: dict, account: Optional[dict] = None) -> str:
         """Create BYE message to terminate call"""
-        account = self.accounts[call_info['account_id']]
+        if account is None:
+            account = self.accounts[call_info['account_id']]
         username = account['username']
         domain = account['domain']
-        
-        message = f"""BYE sip:{call_info['destination']}@{domain} SIP/2.0
-Via: SIP/2.0/UDP {self.local_ip}:5060;branch=z9hG4bK{random.randint(100000, 999999)}
-Max-Forwards: 70
-From: <sip:{username}@{domain}>;tag={call_info['from_tag']}
-To: <sip:{call_info['destination']}@{domain}>;tag={call_info['to_tag']}
-Call-ID: {call_info['sip_call_id']}
-CSeq: 2 BYE
-Content-Length: 0
-
-"""
-        return message
+        destination = call_info['destination']
+        return _IN_DIALOG_TMPL % (
+            'BYE', destination, domain,
+            self.local_ip, _branch(),
+            username, domain, call_info['from_tag'],
+            destination, domain, call_info['to_tag'],
+            call_info['sip_call_id'],
+            2, 'BYE',
+        )
         
     def get_active_calls(self) -> List[dict]:
         """Get list of active calls with detailed info"""
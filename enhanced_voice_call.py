@@ -6,11 +6,11 @@ Fixes the issue where chat opens but call doesn't start
 
 import time
 import webbrowser
-import subprocess
+import ctypes
 import pyautogui
 import sys
 
-def enhanced_whatsapp_call(phone_number: str):
+def enhanced_whatsapp_call(phone_number: str, verbose: bool = False):
     """Enhanced method to ensure voice call actually starts"""
     
     print(f"🔧 ENHANCED WHATSAPP VOICE CALL")
@@ -31,10 +31,13 @@ def enhanced_whatsapp_call(phone_number: str):
     print("✅ WhatsApp URL opened")
     
     # Step 2: Extended wait for WhatsApp to fully load
-    print("⏳ Waiting for WhatsApp to fully load...")
-    for i in range(6, 0, -1):
-        print(f"   {i} seconds remaining...")
-        time.sleep(1)
+    print("⏳ Waiting for WhatsApp to fully load (6 seconds)...")
+    if verbose:
+        for i in range(6, 0, -1):
+            print(f"   {i} seconds remaining...")
+            time.sleep(1)
+    else:
+        time.sleep(6)
     
     # Step 3: Multiple focus attempts with verification
     print("🎯 Ensuring WhatsApp window is focused...")
@@ -106,78 +109,87 @@ def enhanced_whatsapp_call(phone_number: str):
     
     return False
 
+# Win32 focusing goes straight through ctypes; loaded on first use (Windows only)
+_user32 = None
+_WNDENUMPROC = None
+SW_RESTORE = 9
+# Last WhatsApp window found as (hwnd, title); reused while the handle stays valid
+_whatsapp_window = None
+
+def _load_user32():
+    """Load user32 and declare the prototypes used for window focusing"""
+    global _user32, _WNDENUMPROC
+    if _user32 is None:
+        from ctypes import wintypes
+        user32 = ctypes.WinDLL('user32', use_last_error=True)
+        _WNDENUMPROC = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+        user32.EnumWindows.argtypes = [_WNDENUMPROC, wintypes.LPARAM]
+        user32.IsWindow.argtypes = [wintypes.HWND]
+        user32.IsWindowVisible.argtypes = [wintypes.HWND]
+        user32.GetWindowTextLengthW.argtypes = [wintypes.HWND]
+        user32.GetWindowTextW.argtypes = [wintypes.HWND, wintypes.LPWSTR, ctypes.c_int]
+        user32.ShowWindow.argtypes = [wintypes.HWND, ctypes.c_int]
+        user32.BringWindowToTop.argtypes = [wintypes.HWND]
+        user32.SetForegroundWindow.argtypes = [wintypes.HWND]
+        user32.SetActiveWindow.argtypes = [wintypes.HWND]
+        user32.SetActiveWindow.restype = wintypes.HWND
+        user32.SetFocus.argtypes = [wintypes.HWND]
+        user32.SetFocus.restype = wintypes.HWND
+        _user32 = user32
+    return _user32
+
+def _window_title(user32, hwnd) -> str:
+    length = user32.GetWindowTextLengthW(hwnd)
+    if not length:
+        return ""
+    buf = ctypes.create_unicode_buffer(length + 1)
+    user32.GetWindowTextW(hwnd, buf, length + 1)
+    return buf.value
+
+def _find_whatsapp_window(user32):
+    """Return (hwnd, title) of the first visible top-level window titled *WhatsApp*"""
+    found = []
+
+    def on_window(hwnd, lparam):
+        if user32.IsWindowVisible(hwnd):
+            title = _window_title(user32, hwnd)
+            if "WhatsApp" in title:
+                found.append((hwnd, title))
+                return False  # Stop enumerating
+        return True
+
+    user32.EnumWindows(_WNDENUMPROC(on_window), 0)
+    return found[0] if found else (None, "")
+
 def focus_whatsapp_window():
     """Enhanced WhatsApp window focusing"""
+    global _whatsapp_window
     try:
-        focus_script = '''
-        # Find all WhatsApp processes
-        $whatsappProcesses = Get-Process | Where-Object {
-            $_.ProcessName -like "*WhatsApp*" -or 
-            $_.MainWindowTitle -like "*WhatsApp*"
-        } | Where-Object { $_.MainWindowHandle -ne 0 }
-        
-        if ($whatsappProcesses.Count -gt 0) {
-            # Get the main WhatsApp window
-            $mainWindow = $whatsappProcesses | Where-Object {
-                $_.MainWindowTitle -ne "" -and $_.MainWindowTitle -like "*WhatsApp*"
-            } | Select-Object -First 1
-            
-            if ($mainWindow) {
-                # Load required assemblies
-                Add-Type -AssemblyName Microsoft.VisualBasic
-                Add-Type -AssemblyName System.Windows.Forms
-                
-                # Multiple focus methods
-                [Microsoft.VisualBasic.Interaction]::AppActivate($mainWindow.Id)
-                
-                # Win32 API methods for stronger focus
-                Add-Type @"
-                    using System;
-                    using System.Runtime.InteropServices;
-                    public class Win32 {
-                        [DllImport("user32.dll")] public static extern bool SetForegroundWindow(IntPtr hWnd);
-                        [DllImport("user32.dll")] public static extern bool ShowWindow(IntPtr hWnd, int nCmdShow);
-                        [DllImport("user32.dll")] public static extern bool BringWindowToTop(IntPtr hWnd);
-                        [DllImport("user32.dll")] public static extern bool SetActiveWindow(IntPtr hWnd);
-                        [DllImport("user32.dll")] public static extern IntPtr SetFocus(IntPtr hWnd);
-                    }
-"@
-                
-                $handle = $mainWindow.MainWindowHandle
-                [Win32]::ShowWindow($handle, 9)  # SW_RESTORE
-                [Win32]::BringWindowToTop($handle)
-                [Win32]::SetForegroundWindow($handle)
-                [Win32]::SetActiveWindow($handle)
-                [Win32]::SetFocus($handle)
-                
-                # Additional activation
-                [System.Windows.Forms.Application]::DoEvents()
-                
-                Write-Host "SUCCESS: Enhanced focus applied to WhatsApp"
-                Write-Host "Window: $($mainWindow.MainWindowTitle)"
-                Write-Host "Handle: $handle"
-                
-                # Verify focus
-                $activeWindow = Get-Process | Where-Object { $_.Id -eq $mainWindow.Id }
-                if ($activeWindow) {
-                    Write-Host "VERIFIED: WhatsApp is active"
-                } else {
-                    Write-Host "WARNING: Could not verify focus"
-                }
-            } else {
-                Write-Host "ERROR: No WhatsApp window with title found"
-            }
-        } else {
-            Write-Host "ERROR: No WhatsApp processes found"
-        }
-        '''
-        
-        result = subprocess.run(['powershell', '-Command', focus_script], 
-                              capture_output=True, text=True, timeout=10)
-        
-        print(f"Focus result: {result.stdout.strip()}")
-        
-        return "SUCCESS" in result.stdout
+        if sys.platform != 'win32':
+            print("Focus result: ERROR: Window focusing requires Windows")
+            return False
+        user32 = _load_user32()
+        # Only enumerate windows again once the cached handle has gone away
+        if _whatsapp_window is None or not user32.IsWindow(_whatsapp_window[0]):
+            hwnd, title = _find_whatsapp_window(user32)
+            if not hwnd:
+                _whatsapp_window = None
+                print("Focus result: ERROR: No WhatsApp window with title found")
+                return False
+            _whatsapp_window = (hwnd, title)
+        hwnd, title = _whatsapp_window
+
+        # Same sequence the PowerShell helper used, without spawning it
+        user32.ShowWindow(hwnd, SW_RESTORE)
+        user32.BringWindowToTop(hwnd)
+        user32.SetForegroundWindow(hwnd)
+        user32.SetActiveWindow(hwnd)
+        user32.SetFocus(hwnd)
+
+        print("Focus result: SUCCESS: Enhanced focus applied to WhatsApp")
+        print(f"Window: {title}")
+        print(f"Handle: {hwnd}")
+        return True
         
     except Exception as e:
         print(f"Focus error: {e}")
@@ -259,11 +271,11 @@ def provide_manual_guidance(phone_number):
     input("Press Enter after you've manually started the call...")
     return True
 
-def test_with_user_number():
+def test_with_user_number(verbose: bool = False):
     """Interactive test with user's number"""
     phone = input("Enter phone number to test (e.g., +94769804761): ").strip()
     if phone:
-        enhanced_whatsapp_call(phone)
+        enhanced_whatsapp_call(phone, verbose)
     else:
         print("No phone number entered")
 
@@ -272,8 +284,11 @@ if __name__ == "__main__":
     print("Fixes: Chat opens but call doesn't start")
     print("=" * 50)
     
-    if len(sys.argv) > 1:
-        phone_number = sys.argv[1]
-        enhanced_whatsapp_call(phone_number)
+    # --verbose prints a per-second countdown while waiting for WhatsApp
+    verbose = '--verbose' in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != '--verbose']
+    if args:
+        phone_number = args[0]
+        enhanced_whatsapp_call(phone_number, verbose)
     else:
-        test_with_user_number()
\ No newline at end of file
+        test_with_user_number(verbose)
\ No newline at end of file
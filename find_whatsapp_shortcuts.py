@@ -4,9 +4,79 @@ WhatsApp Desktop Keyboard Shortcuts Finder
 Tests various keyboard combinations to find the voice call shortcut
 """
 
+import sys
 import time
+import ctypes
+from ctypes import wintypes
 import pyautogui
-import subprocess
+
+from enhanced_voice_call import focus_whatsapp_window
+
+# Per-second countdown before each test; set by --verbose
+VERBOSE = False
+
+# Shortcuts go out as one SendInput call each: keys pressed in order, released in reverse
+INPUT_KEYBOARD = 1
+KEYEVENTF_KEYUP = 0x0002
+VK_CODES = {
+    'ctrl': 0x11, 'shift': 0x10, 'alt': 0x12, 'enter': 0x0D,
+    'f1': 0x70, 'f2': 0x71, '/': 0xBF, 'c': 0x43, 'h': 0x48, 'v': 0x56,
+}
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = [('wVk', wintypes.WORD), ('wScan', wintypes.WORD), ('dwFlags', wintypes.DWORD),
+                ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [('dx', wintypes.LONG), ('dy', wintypes.LONG), ('mouseData', wintypes.DWORD),
+                ('dwFlags', wintypes.DWORD), ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+class _INPUTUNION(ctypes.Union):
+    # MOUSEINPUT is the largest member, so it sets the size SendInput expects
+    _fields_ = [('mi', MOUSEINPUT), ('ki', KEYBDINPUT)]
+
+class INPUT(ctypes.Structure):
+    _fields_ = [('type', wintypes.DWORD), ('u', _INPUTUNION)]
+
+def build_hotkey(*keys):
+    """Prebuild the INPUT events for a key combination; returns (keys, events)"""
+    vks = [VK_CODES[k] for k in keys]
+    events = (INPUT * (2 * len(vks)))()
+    for i, vk in enumerate(vks + vks[::-1]):
+        events[i].type = INPUT_KEYBOARD
+        events[i].u.ki.wVk = vk
+        if i >= len(vks):
+            events[i].u.ki.dwFlags = KEYEVENTF_KEYUP
+    return keys, events
+
+def send_hotkey(hotkey):
+    """Send a prebuilt hotkey in one SendInput call (pyautogui off Windows)"""
+    keys, events = hotkey
+    if sys.platform != 'win32':
+        pyautogui.hotkey(*keys)
+        return
+    ctypes.windll.user32.SendInput(len(events), events, ctypes.sizeof(INPUT))
+
+# Shortcuts to test for voice calls
+VOICE_CALL_SHORTCUTS = [
+    ("Ctrl+Shift+C", build_hotkey('ctrl', 'shift', 'c')),
+    ("Ctrl+Alt+C", build_hotkey('ctrl', 'alt', 'c')),
+    ("Ctrl+C", build_hotkey('ctrl', 'c')),  # Sometimes just Ctrl+C
+    ("F2", build_hotkey('f2')),
+    ("Ctrl+Shift+V", build_hotkey('ctrl', 'shift', 'v')),  # Video call, but might work
+    ("Ctrl+Enter", build_hotkey('ctrl', 'enter')),
+    ("Alt+C", build_hotkey('alt', 'c')),
+    ("Shift+C", build_hotkey('shift', 'c')),
+]
+
+# Common help shortcuts in WhatsApp
+HELP_SHORTCUTS = [
+    ("Ctrl+/", build_hotkey('ctrl', '/')),
+    ("Ctrl+?", build_hotkey('ctrl', 'shift', '/')),
+    ("F1", build_hotkey('f1')),
+    ("Ctrl+H", build_hotkey('ctrl', 'h')),
+    ("Alt+H", build_hotkey('alt', 'h')),
+]
 
 def get_whatsapp_shortcuts():
     """Display known WhatsApp Desktop keyboard shortcuts"""
@@ -54,31 +124,22 @@ def test_whatsapp_shortcuts():
     print("\n🧪 TESTING WHATSAPP VOICE CALL SHORTCUTS")
     print("=" * 50)
     
-    # List of shortcuts to test for voice calls
-    voice_call_shortcuts = [
-        ("Ctrl+Shift+C", lambda: pyautogui.hotkey('ctrl', 'shift', 'c')),
-        ("Ctrl+Alt+C", lambda: pyautogui.hotkey('ctrl', 'alt', 'c')),
-        ("Ctrl+C", lambda: pyautogui.hotkey('ctrl', 'c')),  # Sometimes just Ctrl+C
-        ("F2", lambda: pyautogui.press('f2')),
-        ("Ctrl+Shift+V", lambda: pyautogui.hotkey('ctrl', 'shift', 'v')),  # Video call, but might work
-        ("Ctrl+Enter", lambda: pyautogui.hotkey('ctrl', 'enter')),
-        ("Alt+C", lambda: pyautogui.hotkey('alt', 'c')),
-        ("Shift+C", lambda: pyautogui.hotkey('shift', 'c')),
-    ]
-    
     print("⚠️  IMPORTANT: Make sure WhatsApp Desktop is open with a chat selected!")
     print("This test will send various keyboard shortcuts to find the voice call key.\n")
     
     input("Press Enter when WhatsApp is ready and you're in a chat window...")
     
-    for i, (shortcut_name, shortcut_func) in enumerate(voice_call_shortcuts, 1):
+    for i, (shortcut_name, hotkey) in enumerate(VOICE_CALL_SHORTCUTS, 1):
         print(f"\n🔹 Test {i}: Trying {shortcut_name}")
         print("   Sending shortcut in 3 seconds...")
         
         # Countdown
-        for countdown in range(3, 0, -1):
-            print(f"   {countdown}...")
-            time.sleep(1)
+        if VERBOSE:
+            for countdown in range(3, 0, -1):
+                print(f"   {countdown}...")
+                time.sleep(1)
+        else:
+            time.sleep(3)
         
         try:
             # Focus WhatsApp first
@@ -86,7 +147,7 @@ def test_whatsapp_shortcuts():
             time.sleep(0.5)
             
             # Send the shortcut
-            shortcut_func()
+            send_hotkey(hotkey)
             print(f"   ✅ Sent {shortcut_name}")
             
             # Ask user for feedback
@@ -114,15 +175,7 @@ def test_whatsapp_shortcuts():
 def focus_whatsapp():
     """Focus WhatsApp Desktop window"""
     try:
-        focus_cmd = '''
-        $whatsappProcess = Get-Process | Where-Object {$_.MainWindowTitle -like "*WhatsApp*"} | Select-Object -First 1
-        if ($whatsappProcess) {
-            Add-Type -AssemblyName Microsoft.VisualBasic
-            [Microsoft.VisualBasic.Interaction]::AppActivate($whatsappProcess.Id)
-        }
-        '''
-        subprocess.run(['powershell', '-Command', focus_cmd], 
-                      capture_output=True, timeout=3)
+        focus_whatsapp_window()
     except:
         pass
 
@@ -134,22 +187,14 @@ def check_whatsapp_help():
     print("Attempting to open WhatsApp keyboard shortcuts help...")
     print("This will try common help shortcuts in WhatsApp:")
     
-    help_shortcuts = [
-        ("Ctrl+/", lambda: pyautogui.hotkey('ctrl', '/')),
-        ("Ctrl+?", lambda: pyautogui.hotkey('ctrl', 'shift', '/')),
-        ("F1", lambda: pyautogui.press('f1')),
-        ("Ctrl+H", lambda: pyautogui.hotkey('ctrl', 'h')),
-        ("Alt+H", lambda: pyautogui.hotkey('alt', 'h')),
-    ]
-    
     input("Press Enter when WhatsApp Desktop is focused...")
     
-    for shortcut_name, shortcut_func in help_shortcuts:
+    for shortcut_name, hotkey in HELP_SHORTCUTS:
         try:
             print(f"Trying {shortcut_name}...")
             focus_whatsapp()
             time.sleep(0.5)
-            shortcut_func()
+            send_hotkey(hotkey)
             time.sleep(1)
             
             response = input(f"Did {shortcut_name} open help/shortcuts? (y/n): ").strip().lower()
@@ -183,6 +228,7 @@ def manual_investigation():
     print("   • Use WhatsApp Web (web.whatsapp.com) and check shortcuts there")
 
 if __name__ == "__main__":
+    VERBOSE = '--verbose' in sys.argv[1:]
     print("WHATSAPP VOICE CALL SHORTCUT FINDER")
     print("=" * 50)
     
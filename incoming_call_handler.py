@@ -4,17 +4,108 @@ Handles incoming INVITE requests properly
 """
 
 import socket
+import selectors
 import threading
 import time
 import re
+import os
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Dict, Optional, Callable
 
+# INVITE parsing: user part of the From URI, and the headers we keep (lowercased name -> info key)
+_USER_RE = re.compile(r'sip:([^@]+)@')
+_HEADER_KEYS = {
+    'call-id': 'call_id',
+    'from': 'from_header',
+    'to': 'to_header',
+    'via': 'via_header',
+    'cseq': 'cseq',
+    'contact': 'contact',
+    # RFC 3261 compact forms
+    'i': 'call_id',
+    'f': 'from_header',
+    't': 'to_header',
+    'v': 'via_header',
+    'm': 'contact',
+}
+
+# Datagrams read from one ready socket before returning to select()
+_RX_BATCH = 32
+
+# Outgoing messages, built straight to bytes with CRLF line endings (RFC 3261)
+_ECHO_RESPONSE_TMPL = (b"SIP/2.0 %b\r\nVia: %b\r\nFrom: %b\r\nTo: %b%b\r\nCall-ID: %b\r\n"
+                       b"CSeq: %b\r\nContent-Length: 0\r\n\r\n")
+_200_OK_TMPL = (b"SIP/2.0 200 OK\r\nVia: %b\r\nFrom: %b\r\nTo: %b;tag=incoming-%d\r\nCall-ID: %b\r\n"
+                b"CSeq: %b\r\nContact: <sip:%b:%d>\r\nContent-Type: application/sdp\r\n"
+                b"Content-Length: %d\r\n\r\n%b")
+_SDP_TMPL = (b"v=0\r\no=user 123456 123456 IN IP4 %b\r\ns=-\r\nc=IN IP4 %b\r\nt=0 0\r\n"
+             b"m=audio %d RTP/AVP 0 8\r\na=rtpmap:0 PCMU/8000\r\na=rtpmap:8 PCMA/8000\r\na=sendrecv\r\n")
+_BYE_TMPL = (b"BYE sip:%b@%b SIP/2.0\r\nVia: SIP/2.0/UDP %b:%d;branch=z9hG4bK%d\r\n"
+             b"From: <sip:%b:%d>;tag=local-%d\r\nTo: <sip:%b@%b>\r\nCall-ID: %b\r\n"
+             b"CSeq: 1 BYE\r\nContent-Length: 0\r\n\r\n")
+
+
+def _echo_response(status: bytes, call_info: Dict[str, str], to_suffix: bytes = b'') -> bytes:
+    """Build a body-less response echoing the request's dialog headers"""
+    get = call_info.get
+    return _ECHO_RESPONSE_TMPL % (
+        status,
+        get('via_header', '').encode('utf-8'),
+        get('from_header', '').encode('utf-8'),
+        get('to_header', '').encode('utf-8'),
+        to_suffix,
+        get('call_id', '').encode('utf-8'),
+        get('cseq', '').encode('utf-8'),
+    )
+
+@dataclass
+class IncomingCall:
+    """State of one incoming call"""
+    __slots__ = ('account_id', 'from_user', 'from_addr', 'sock', 'state', 'start_time',
+                 'original_message', 'call_info', 'local_ip', 'local_port')
+    account_id: int
+    from_user: str
+    from_addr: tuple
+    sock: socket.socket
+    state: str
+    start_time: float
+    original_message: str
+    call_info: Dict[str, str]
+    local_ip: str
+    local_port: int
+
+    def as_dict(self) -> Dict:
+        """Plain mapping of the call's fields"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
 class IncomingCallHandler:
     def __init__(self, working_sip_manager):
         self.sip_manager = working_sip_manager
-        self.listening_threads = {}
+        self.listening_sockets = {}
+        # One selector thread receives for every listening account
+        self._selector = selectors.DefaultSelector()
+        self._sock_to_account = {}  # fd -> (account_id, sock)
+        self._selector_lock = threading.Lock()
+        self._dispatch_thread = None
+        # Callbacks and answers run on a small pool so they never stall the receive loop
+        self._pool = ThreadPoolExecutor(max_workers=max(2, os.cpu_count() or 1))
+        # Delayed work run by the dispatch loop: (deadline, seq, func, args)
+        self._timers = []
+        self._timer_seq = itertools.count()
         self.active_calls = {}
         self.on_incoming_call = None  # Callback for GUI notification
+        # Request method (raw bytes before the first space) -> handler
+        self._METHOD_TABLE = {
+            b'INVITE': self._handle_incoming_invite,
+            b'OPTIONS': self._handle_incoming_options,
+            b'BYE': self._handle_incoming_bye,
+            b'CANCEL': self._handle_incoming_cancel,
+            b'ACK': self._handle_incoming_ack,
+        }
         
     def start_listening(self, account_id: int):
         """Start listening for incoming calls on account's port"""
@@ -27,64 +118,109 @@ class IncomingCallHandler:
         # Stop existing listener if any
         self.stop_listening(account_id)
         
-        # Start new listener thread
-        thread = threading.Thread(
-            target=self._listen_for_incoming_calls,
-            args=(account_id, port),
-            daemon=True
-        )
-        thread.start()
-        self.listening_threads[account_id] = thread
+        try:
+            # Create socket for listening
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(('0.0.0.0', port))
+            sock.setblocking(False)
+        except Exception as e:
+            print(f"Error setting up incoming call listener for account {account_id}: {e}")
+            return False
+            
+        with self._selector_lock:
+            self._selector.register(sock, selectors.EVENT_READ)
+            self._sock_to_account[sock.fileno()] = (account_id, sock)
+            self.listening_sockets[account_id] = sock
+            if self._dispatch_thread is None:
+                self._dispatch_thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+                self._dispatch_thread.start()
         
         print(f"📞 Started listening for incoming calls on account {account_id} (port {port})")
         return True
         
     def stop_listening(self, account_id: int):
         """Stop listening for incoming calls on account"""
-        if account_id in self.listening_threads:
-            # Thread will stop when account is removed or daemon thread ends
-            del self.listening_threads[account_id]
-            
-    def _listen_for_incoming_calls(self, account_id: int, port: int):
-        """Listen for incoming calls on specified port"""
+        with self._selector_lock:
+            sock = self.listening_sockets.pop(account_id, None)
+            if sock is None:
+                return
+            self._sock_to_account.pop(sock.fileno(), None)
+            try:
+                self._selector.unregister(sock)
+            except (KeyError, ValueError):
+                pass
         try:
-            # Create socket for listening
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            sock.bind(('0.0.0.0', port))
-            sock.settimeout(1.0)  # 1 second timeout for checking if we should stop
-            
-            print(f"🎧 Listening for incoming calls on port {port} for account {account_id}")
+            sock.close()
+        except:
+            pass
             
-            while account_id in self.sip_manager.accounts:
-                try:
-                    data, addr = sock.recvfrom(4096)
-                    message = data.decode('utf-8')
-                    
-                    # Handle different types of incoming messages
-                    if message.startswith('INVITE'):
-                        self._handle_incoming_invite(account_id, message, addr, sock)
-                    elif message.startswith('OPTIONS'):
-                        self._handle_incoming_options(account_id, message, addr, sock)
-                    elif message.startswith('BYE'):
-                        self._handle_incoming_bye(account_id, message, addr, sock)
-                    elif message.startswith('CANCEL'):
-                        self._handle_incoming_cancel(account_id, message, addr, sock)
-                    elif message.startswith('ACK'):
-                        self._handle_incoming_ack(account_id, message, addr, sock)
-                        
-                except socket.timeout:
+    def _dispatch_loop(self):
+        """Receive incoming call traffic for all listening accounts"""
+        method_table = self._METHOD_TABLE
+        # Receive into one reused buffer owned by this thread
+        rx_buf = bytearray(4096)
+        rx_view = memoryview(rx_buf)
+        while True:
+            # Drop listeners whose account has been removed
+            for account_id in [a for a in list(self.listening_sockets) if a not in self.sip_manager.accounts]:
+                self.stop_listening(account_id)
+            with self._selector_lock:
+                if not self.listening_sockets:
+                    # Nothing left to listen on; the next start_listening starts a new loop
+                    self._dispatch_thread = None
+                    return
+            try:
+                events = self._selector.select(timeout=self._run_due_timers())
+            except (OSError, ValueError):
+                # A socket was closed while selecting
+                continue
+            for key, _ in events:
+                entry = self._sock_to_account.get(key.fd)
+                if entry is None:
                     continue
-                except Exception as e:
-                    print(f"Error receiving incoming call data: {e}")
-                    
-        except Exception as e:
-            print(f"Error setting up incoming call listener for account {account_id}: {e}")
-        finally:
+                account_id, sock = entry
+                # Drain what is queued on this socket (bounded, so other accounts get a turn)
+                for _ in range(_RX_BATCH):
+                    try:
+                        nbytes, addr = sock.recvfrom_into(rx_buf, 4096)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    except Exception as e:
+                        print(f"Error receiving incoming call data: {e}")
+                        break
+                    try:
+                        # Dispatch on the method token; only decode packets we handle
+                        sp = rx_buf.find(b' ', 0, min(nbytes, 8))
+                        handler = method_table.get(bytes(rx_view[:sp])) if sp > 0 else None
+                        if handler:
+                            handler(account_id, str(rx_view[:nbytes], 'utf-8'), addr, sock)
+                    except Exception as e:
+                        print(f"Error handling incoming SIP request from {addr}: {e}")
+                
+    def _schedule(self, delay: float, func: Callable, *args):
+        """Run func(*args) on the worker pool after delay seconds"""
+        with self._selector_lock:
+            heapq.heappush(self._timers, (time.monotonic() + delay, next(self._timer_seq), func, args))
+            
+    def _run_due_timers(self) -> float:
+        """Hand due timers to the pool; return how long select() may wait"""
+        now = time.monotonic()
+        with self._selector_lock:
+            timers = self._timers
+            while timers and timers[0][0] <= now:
+                _, _, func, args = heapq.heappop(timers)
+                self._pool.submit(func, *args)
+            return min(0.5, timers[0][0] - now) if timers else 0.5
+            
+    def _notify_incoming_call(self, account_id: int, call_id: str, from_user: str, addr: tuple):
+        """Deliver an incoming call to the GUI callback (worker pool)"""
+        callback = self.on_incoming_call
+        if callback:
             try:
-                sock.close()
-            except:
-                pass
+                callback(account_id, call_id, from_user, addr)
+            except Exception as e:
+                print(f"Error in incoming call callback for {call_id}: {e}")
                 
     def _handle_incoming_invite(self, account_id: int, message: str, addr: tuple, sock: socket.socket):
         """Handle incoming INVITE (call request)"""
@@ -97,28 +233,31 @@ class IncomingCallHandler:
             from_user = call_info.get('from_user', 'unknown')
             
             # Store call information with original message
-            self.active_calls[call_id] = {
-                'account_id': account_id,
-                'from_user': from_user,
-                'from_addr': addr,
-                'sock': sock,
-                'state': 'INCOMING',
-                'start_time': time.time(),
-                'original_message': message,
-                'call_info': call_info
-            }
+            self.active_calls[call_id] = IncomingCall(
+                account_id=account_id,
+                from_user=from_user,
+                from_addr=addr,
+                sock=sock,
+                state='INCOMING',
+                start_time=time.time(),
+                original_message=message,
+                call_info=call_info,
+                # Local contact address is fixed for the call's lifetime
+                local_ip=self.sip_manager.local_ip,
+                local_port=sock.getsockname()[1]
+            )
             
             # Send 100 Trying immediately
             trying_response = self._create_100_trying_response(call_info)
-            sock.sendto(trying_response.encode('utf-8'), addr)
+            sock.sendto(trying_response, addr)
             print(f"📤 Sent 100 Trying for call {call_id}")
             
             # Notify GUI about incoming call
             if self.on_incoming_call:
-                self.on_incoming_call(account_id, call_id, from_user, addr)
+                self._pool.submit(self._notify_incoming_call, account_id, call_id, from_user, addr)
             else:
                 # Auto-answer after 2 seconds if no GUI handler
-                threading.Timer(2.0, self._auto_answer_call, args=(call_id,)).start()
+                self._schedule(2.0, self._auto_answer_call, call_id)
                 
         except Exception as e:
             print(f"Error handling incoming INVITE: {e}")
@@ -126,41 +265,25 @@ class IncomingCallHandler:
     def _parse_invite_message(self, message: str) -> Dict[str, str]:
         """Parse incoming INVITE message to extract key information"""
         info = {}
-        lines = message.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('Call-ID:'):
-                info['call_id'] = line.split(':', 1)[1].strip()
-            elif line.startswith('From:'):
-                from_header = line.split(':', 1)[1].strip()
-                info['from_header'] = from_header
-                # Extract username from From header
-                user_match = re.search(r'sip:([^@]+)@', from_header)
-                if user_match:
-                    info['from_user'] = user_match.group(1)
-            elif line.startswith('To:'):
-                info['to_header'] = line.split(':', 1)[1].strip()
-            elif line.startswith('Via:'):
-                info['via_header'] = line.split(':', 1)[1].strip()
-            elif line.startswith('CSeq:'):
-                info['cseq'] = line.split(':', 1)[1].strip()
-            elif line.startswith('Contact:'):
-                info['contact'] = line.split(':', 1)[1].strip()
+        header_key = _HEADER_KEYS.get
+        for line in message.splitlines():
+            if not line:
+                break  # End of headers; the body is not scanned
+            name, sep, value = line.partition(':')
+            key = header_key(name.strip().lower()) if sep else None
+            if key:
+                info[key] = value.strip()
+                
+        # Extract username from From header
+        user_match = _USER_RE.search(info.get('from_header', ''))
+        if user_match:
+            info['from_user'] = user_match.group(1)
                 
         return info
         
-    def _create_100_trying_response(self, call_info: Dict[str, str]) -> str:
+    def _create_100_trying_response(self, call_info: Dict[str, str]) -> bytes:
         """Create 100 Trying response for incoming INVITE"""
-        return f"""SIP/2.0 100 Trying
-Via: {call_info.get('via_header', '')}
-From: {call_info.get('from_header', '')}
-To: {call_info.get('to_header', '')}
-Call-ID: {call_info.get('call_id', '')}
-CSeq: {call_info.get('cseq', '')}
-Content-Length: 0
-
-"""
+        return _echo_response(b"100 Trying", call_info)
 
     def answer_call(self, call_id: str) -> bool:
         """Answer an incoming call"""
@@ -172,10 +295,10 @@ Content-Length: 0
         try:
             # Create 200 OK response with SDP
             response = self._create_200_ok_response(call_id)
-            call['sock'].sendto(response.encode('utf-8'), call['from_addr'])
+            call.sock.sendto(response, call.from_addr)
             
-            call['state'] = 'ANSWERED'
-            print(f"✅ Answered call {call_id} from {call['from_user']}")
+            call.state = 'ANSWERED'
+            print(f"✅ Answered call {call_id} from {call.from_user}")
             return True
             
         except Exception as e:
@@ -191,10 +314,10 @@ Content-Length: 0
         try:
             # Create 486 Busy Here response
             response = self._create_486_busy_response(call_id)
-            call['sock'].sendto(response.encode('utf-8'), call['from_addr'])
+            call.sock.sendto(response, call.from_addr)
             
-            call['state'] = 'REJECTED'
-            print(f"❌ Rejected call {call_id} from {call['from_user']}")
+            call.state = 'REJECTED'
+            print(f"❌ Rejected call {call_id} from {call.from_user}")
             
             # Clean up call
             del self.active_calls[call_id]
@@ -206,65 +329,43 @@ Content-Length: 0
             
     def _auto_answer_call(self, call_id: str):
         """Automatically answer a call after timeout"""
-        if call_id in self.active_calls and self.active_calls[call_id]['state'] == 'INCOMING':
+        if call_id in self.active_calls and self.active_calls[call_id].state == 'INCOMING':
             print(f"🤖 Auto-answering call {call_id}")
             self.answer_call(call_id)
             
-    def _create_200_ok_response(self, call_id: str) -> str:
+    def _create_200_ok_response(self, call_id: str) -> bytes:
         """Create 200 OK response for answered call"""
         if call_id not in self.active_calls:
-            return ""
+            return b""
             
         call = self.active_calls[call_id]
-        call_info = call['call_info']
+        call_info = call.call_info
         
         # Get local IP and port
-        local_ip = self.sip_manager.local_ip
-        local_port = call['sock'].getsockname()[1]
+        local_ip = call.local_ip.encode('utf-8')
+        local_port = call.local_port
         
         # Create SDP for audio
-        sdp = f"""v=0
-o=user 123456 123456 IN IP4 {local_ip}
-s=-
-c=IN IP4 {local_ip}
-t=0 0
-m=audio {local_port + 1000} RTP/AVP 0 8
-a=rtpmap:0 PCMU/8000
-a=rtpmap:8 PCMA/8000
-a=sendrecv
-"""
-
-        response = f"""SIP/2.0 200 OK
-Via: {call_info.get('via_header', '')}
-From: {call_info.get('from_header', '')}
-To: {call_info.get('to_header', '')};tag=incoming-{int(time.time())}
-Call-ID: {call_id}
-CSeq: {call_info.get('cseq', '')}
-Contact: <sip:{local_ip}:{local_port}>
-Content-Type: application/sdp
-Content-Length: {len(sdp)}
-
-{sdp}"""
+        sdp = _SDP_TMPL % (local_ip, local_ip, local_port + 1000)
         
-        return response
+        return _200_OK_TMPL % (
+            call_info.get('via_header', '').encode('utf-8'),
+            call_info.get('from_header', '').encode('utf-8'),
+            call_info.get('to_header', '').encode('utf-8'),
+            int(time.time()),
+            call_id.encode('utf-8'),
+            call_info.get('cseq', '').encode('utf-8'),
+            local_ip, local_port,
+            len(sdp), sdp,
+        )
         
-    def _create_486_busy_response(self, call_id: str) -> str:
+    def _create_486_busy_response(self, call_id: str) -> bytes:
         """Create 486 Busy Here response"""
         if call_id not in self.active_calls:
-            return ""
+            return b""
             
-        call = self.active_calls[call_id]
-        call_info = call['call_info']
-        
-        return f"""SIP/2.0 486 Busy Here
-Via: {call_info.get('via_header', '')}
-From: {call_info.get('from_header', '')}
-To: {call_info.get('to_header', '')};tag=busy-{int(time.time())}
-Call-ID: {call_id}
-CSeq: {call_info.get('cseq', '')}
-Content-Length: 0
-
-"""
+        call_info = self.active_calls[call_id].call_info
+        return _echo_response(b"486 Busy Here", call_info, b";tag=busy-%d" % int(time.time()))
 
     def _handle_incoming_options(self, account_id: int, message: str, addr: tuple, sock: socket.socket):
         """Handle incoming OPTIONS request"""
@@ -280,16 +381,7 @@ Content-Length: 0
             del self.active_calls[call_id]
             
         # Send 200 OK to BYE
-        response = f"""SIP/2.0 200 OK
-Via: {call_info.get('via_header', '')}
-From: {call_info.get('from_header', '')}
-To: {call_info.get('to_header', '')}
-Call-ID: {call_id}
-CSeq: {call_info.get('cseq', '')}
-Content-Length: 0
-
-"""
-        sock.sendto(response.encode('utf-8'), addr)
+        sock.sendto(_echo_response(b"200 OK", call_info), addr)
         
     def _handle_incoming_cancel(self, account_id: int, message: str, addr: tuple, sock: socket.socket):
         """Handle incoming CANCEL (call cancellation)"""
@@ -301,16 +393,7 @@ Content-Length: 0
             del self.active_calls[call_id]
             
         # Send 200 OK to CANCEL
-        response = f"""SIP/2.0 200 OK
-Via: {call_info.get('via_header', '')}
-From: {call_info.get('from_header', '')}
-To: {call_info.get('to_header', '')}
-Call-ID: {call_id}
-CSeq: {call_info.get('cseq', '')}
-Content-Length: 0
-
-"""
-        sock.sendto(response.encode('utf-8'), addr)
+        sock.sendto(_echo_response(b"200 OK", call_info), addr)
         
     def _handle_incoming_ack(self, account_id: int, message: str, addr: tuple, sock: socket.socket):
         """Handle incoming ACK (call establishment confirmation)"""
@@ -318,12 +401,12 @@ Content-Length: 0
         call_id = call_info.get('call_id')
         
         if call_id in self.active_calls:
-            self.active_calls[call_id]['state'] = 'ESTABLISHED'
+            self.active_calls[call_id].state = 'ESTABLISHED'
             print(f"✅ Call {call_id} established successfully")
             
     def get_active_calls(self) -> Dict:
         """Get list of active calls"""
-        return self.active_calls.copy()
+        return {call_id: call.as_dict() for call_id, call in self.active_calls.items()}
         
     def hangup_call(self, call_id: str) -> bool:
         """Hangup an active call"""
@@ -334,7 +417,7 @@ Content-Length: 0
         try:
             # Send BYE to hangup
             bye_msg = self._create_bye_message(call_id)
-            call['sock'].sendto(bye_msg.encode('utf-8'), call['from_addr'])
+            call.sock.sendto(bye_msg, call.from_addr)
             
             print(f"📞 Sent BYE for call {call_id}")
             del self.active_calls[call_id]
@@ -344,21 +427,17 @@ Content-Length: 0
             print(f"Error hanging up call {call_id}: {e}")
             return False
             
-    def _create_bye_message(self, call_id: str) -> str:
+    def _create_bye_message(self, call_id: str) -> bytes:
         """Create BYE message to hangup call"""
         if call_id not in self.active_calls:
-            return ""
+            return b""
             
         call = self.active_calls[call_id]
-        local_ip = self.sip_manager.local_ip
-        local_port = call['sock'].getsockname()[1]
+        local_ip = call.local_ip.encode('utf-8')
+        local_port = call.local_port
+        user = call.from_user.encode('utf-8')
+        host = call.from_addr[0].encode('utf-8')
+        now = int(time.time())
         
-        return f"""BYE sip:{call['from_user']}@{call['from_addr'][0]} SIP/2.0
-Via: SIP/2.0/UDP {local_ip}:{local_port};branch=z9hG4bK{int(time.time())}
-From: <sip:{local_ip}:{local_port}>;tag=local-{int(time.time())}
-To: <sip:{call['from_user']}@{call['from_addr'][0]}>
-Call-ID: {call_id}
-CSeq: 1 BYE
-Content-Length: 0
-
-"""
+        return _BYE_TMPL % (user, host, local_ip, local_port, now,
+                            local_ip, local_port, now, user, host, call_id.encode('utf-8'))
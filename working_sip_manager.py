@@ -100,7 +100,7 @@ class WorkingSipManager:
             )
             
             # Send OPTIONS
-            sock.sendto(options_msg.encode('utf-8'), (account['domain'], account['port']))
+            sock.sendto(options_msg.encode('utf-8'), account['sockaddr'])
             print(f"📡 Sent OPTIONS ping to {account['username']}")
             
             return True
@@ -140,6 +140,25 @@ Content-Length: 0
         self.sockets.clear()
         print("Working SIP Manager shutdown")
         
+    def _resolve_server(self, account: dict) -> tuple:
+        """Resolve the SIP server once and cache it as account['sockaddr'] for every send"""
+        try:
+            info = socket.getaddrinfo(account['domain'], account['port'], socket.AF_INET, socket.SOCK_DGRAM)
+            account['sockaddr'] = info[0][4]
+        except OSError:
+            # Unresolvable right now; let sendto try the name as before
+            account['sockaddr'] = (account['domain'], account['port'])
+        return account['sockaddr']
+        
+    def _size_sip_socket_buffers(self, sock: socket.socket):
+        """Give the SIP socket 1 MiB kernel buffers so registration/INVITE bursts are not dropped"""
+        # Linux caps these at net.core.rmem_max / wmem_max; raise those via sysctl for the full size
+        for opt in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, opt, 1 << 20)
+            except OSError:
+                pass
+        
     def add_account(self, account_id: int, config: dict) -> bool:
         """Add a SIP account"""
         try:
@@ -157,20 +176,16 @@ Content-Length: 0
                 'registration_expires': 0,
                 'cseq': 1
             }
+            self._resolve_server(self.accounts[account_id])
             
             # Create UDP socket for this account
             sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             sock.settimeout(15.0)  # Increased timeout from 10 to 15 seconds
+            self._size_sip_socket_buffers(sock)
             
             # Special handling for account 1 - add comprehensive socket options
             if account_id == 1:
                 sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                # Set larger socket buffers for account 1
-                try:
-                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
-                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
-                except:
-                    pass
                 # Set socket to blocking mode with longer timeout for account 1
                 sock.settimeout(20.0)  # Even longer timeout for account 1
             
@@ -265,6 +280,7 @@ Content-Length: 0
                     new_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
                     new_sock.settimeout(15.0)
                     new_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                    self._size_sip_socket_buffers(new_sock)
                     
                     # Find an available port starting from 5061
                     local_port = 5061
@@ -290,14 +306,15 @@ Content-Length: 0
             branch = f"z9hG4bK{random.randint(100000, 999999)}"
             local_port = sock.getsockname()[1]
             
-            # Step 1: Send initial REGISTER request
+            # Step 1: Send initial REGISTER request (re-resolving the server picks up DNS changes)
+            server = self._resolve_server(account)
             print(f"Sending REGISTER for {account['username']}@{account['domain']}...")
             
             register_msg = self._create_register_message(
                 account, call_id, from_tag, branch, local_port, account['cseq']
             )
             
-            sock.sendto(register_msg.encode('utf-8'), (account['domain'], account['port']))
+            sock.sendto(register_msg.encode('utf-8'), server)
             account['cseq'] += 1
             
             # Step 2: Wait for response
@@ -332,7 +349,7 @@ Content-Length: 0
                     
                     if auth_response:
                         print(f"Sending authenticated REGISTER for {account['username']}...")
-                        sock.sendto(auth_response.encode('utf-8'), (account['domain'], account['port']))
+                        sock.sendto(auth_response.encode('utf-8'), server)
                         account['cseq'] += 1
                         
                         # Step 4: Wait for final response